@@ -0,0 +1,244 @@
+#+
+# Deterministic generator of synthetic asset trees for benchmarking.
+# Can be imported by the other benchmarks, or run on its own as
+#
+#     python3 bench/corpus.py [--files=«n»] [--seed=«n»] [--resolutions=«r»,...]
+#         [--broken=«fraction»] «dir»
+#
+# to write a corpus into «dir», which must not exist yet. The same
+# options always produce the same tree, byte for byte. Each .mhmat file
+# uses one combination of texture maps, cycling through all of them,
+# and a random selection of the other keywords. Textures come from a
+# pool shared between materials, at each of the given resolutions, or
+# are unique to one material. A fraction of the files have a texture
+# reference that is missing or misnamed (differs from the real file in
+# case or extension), for exercising the error paths.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import itertools
+import random
+import json
+import zlib
+import struct
+import getopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "import_mhmat_material"))
+import mhmat
+
+corpus_version = 1
+  # increment this if the same options would produce a different tree
+
+default_resolutions = (64, 256, 1024)
+files_per_dir = 100
+
+def write_png(pathname, width, height, nr_channels, value = 128) :
+    # writes a minimal PNG file filled with a single grey level.
+
+    def chunk(chunk_type, data) :
+        return \
+            (
+                struct.pack(">I", len(data))
+            +
+                chunk_type
+            +
+                data
+            +
+                struct.pack(">I", zlib.crc32(chunk_type + data))
+            )
+    #end chunk
+
+#begin write_png
+    colour_type = {1 : 0, 2 : 4, 3 : 2, 4 : 6}[nr_channels]
+    raw = b"".join(b"\0" + bytes((value,)) * (width * nr_channels) for row in range(height))
+    with open(pathname, "wb") as outfile :
+        outfile.write \
+          (
+                b"\x89PNG\r\n\x1a\n"
+            +
+                chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colour_type, 0, 0, 0))
+            +
+                chunk(b"IDAT", zlib.compress(raw))
+            +
+                chunk(b"IEND", b"")
+          )
+    #end with
+#end write_png
+
+def texture_channels(keyword, rng) :
+    # how many channels a texture for the specified keyword should have.
+    if mhmat.valid_keywords[keyword]["is_colour"] :
+        nr_channels = rng.choice((3, 3, 4))
+    else :
+        nr_channels = 1
+    #end if
+    return \
+        nr_channels
+#end texture_channels
+
+def keyword_value(keyword, rng) :
+    # returns a random valid value for a non-texture keyword, as text.
+    entry = mhmat.valid_keywords[keyword]
+    if isinstance(entry["default"], bool) :
+        value = rng.choice(("true", "false"))
+    elif entry["nr_args"] == 3 :
+        value = " ".join("%.3f" % rng.random() for i in range(3))
+    else :
+        value = "%.3f" % rng.random()
+    #end if
+    return \
+        value
+#end keyword_value
+
+def make_corpus(dirname, nr_files = 1000, seed = 1, resolutions = default_resolutions, broken = 0.05) :
+    # writes a synthetic asset tree into dirname, which is created, and
+    # returns a manifest dict describing it, which is also saved as
+    # corpus.json in dirname.
+    rng = random.Random(seed)
+    os.makedirs(dirname)
+    texture_keywords = mhmat.texture_keywords
+    other_keywords = tuple(k for k in mhmat.valid_keywords if k not in texture_keywords)
+    combinations = list \
+      (
+        maps
+        for nr_maps in range(len(texture_keywords) + 1)
+        for maps in itertools.combinations(texture_keywords, nr_maps)
+      )
+    shared_dir = os.path.join(dirname, "textures")
+    os.makedirs(shared_dir)
+    shared = {} # keyword => list of pathnames
+    grey_level = itertools.cycle(range(1, 255))
+      # so no two textures have the same contents
+    for keyword in texture_keywords :
+        for resolution in resolutions :
+            for i in range(2) :
+                pathname = os.path.join(shared_dir, "%s_%d_%d.png" % (keyword, resolution, i))
+                write_png(pathname, resolution, resolution, texture_channels(keyword, rng), next(grey_level))
+                shared.setdefault(keyword, []).append(pathname)
+            #end for
+        #end for
+    #end for
+    filepaths = []
+    broken_files = []
+    for index in range(nr_files) :
+        subdir = os.path.join(dirname, "set_%03d" % (index // files_per_dir))
+        os.makedirs(subdir, exist_ok = True)
+        filepath = os.path.join(subdir, "material_%05d.mhmat" % index)
+        lines = ["# synthetic material %d" % index, "name material_%05d" % index]
+        if rng.random() < 0.5 :
+            lines.append("tag synthetic")
+            lines.append("tag %s" % rng.choice(("skin", "cloth", "hair", "eyes")))
+            lines.append("description synthetic benchmark material number %d" % index)
+        #end if
+        for keyword in other_keywords :
+            if rng.random() < 0.5 :
+                lines.append("%s %s" % (keyword, keyword_value(keyword, rng)))
+            #end if
+        #end for
+        if rng.random() < 0.1 :
+            lines.append("shader data/shaders/glsl/litsphere") # ignored keyword
+        #end if
+        references = []
+        for keyword in combinations[index % len(combinations)] :
+            if rng.random() < 0.25 :
+                # unique to this material
+                pathname = os.path.join(subdir, "material_%05d_%s.png" % (index, keyword))
+                resolution = rng.choice(resolutions)
+                write_png(pathname, resolution, resolution, texture_channels(keyword, rng), next(grey_level))
+            else :
+                pathname = rng.choice(shared[keyword])
+            #end if
+            references.append([keyword, os.path.relpath(pathname, subdir)])
+        #end for
+        if rng.random() < broken :
+            if len(references) != 0 and rng.random() < 0.5 :
+                reference = rng.choice(references)
+                texdir, texname = os.path.split(reference[1])
+                stem, ext = os.path.splitext(texname)
+                reference[1] = os.path.join(texdir, rng.choice((stem.upper() + ext, stem + ".jpg")))
+                problem = "misnamed"
+            else :
+                references.append(["diffuseTexture", "missing_%05d.png" % index])
+                problem = "missing"
+            #end if
+            broken_files.append({"file" : os.path.relpath(filepath, dirname), "problem" : problem})
+        #end if
+        lines.extend("%s %s" % (keyword, texname) for keyword, texname in references)
+        with open(filepath, "wt") as outfile :
+            outfile.write("".join(line + "\n" for line in lines))
+        #end with
+        filepaths.append(os.path.relpath(filepath, dirname))
+    #end for
+    manifest = \
+        {
+            "version" : corpus_version,
+            "params" :
+                {
+                    "files" : nr_files,
+                    "seed" : seed,
+                    "resolutions" : list(resolutions),
+                    "broken" : broken,
+                },
+            "files" : filepaths,
+            "broken" : broken_files,
+        }
+    with open(os.path.join(dirname, "corpus.json"), "wt") as outfile :
+        json.dump(manifest, outfile, indent = 4)
+        outfile.write("\n")
+    #end with
+    return \
+        manifest
+#end make_corpus
+
+def load_manifest(dirname) :
+    # returns the manifest of a corpus previously written by make_corpus.
+    with open(os.path.join(dirname, "corpus.json"), "rt") as infile :
+        manifest = json.load(infile)
+    #end with
+    return \
+        manifest
+#end load_manifest
+
+def parse_options(opts) :
+    # returns a dict of keyword arguments for make_corpus from those
+    # getopt results that are for the corpus, as used by the command
+    # lines of this and the other benchmarks.
+    result = {}
+    for keyword, value in opts :
+        if keyword == "--files" :
+            result["nr_files"] = int(value)
+        elif keyword == "--seed" :
+            result["seed"] = int(value)
+        elif keyword == "--resolutions" :
+            result["resolutions"] = tuple(int(r) for r in value.split(","))
+        elif keyword == "--broken" :
+            result["broken"] = float(value)
+        #end if
+    #end for
+    return \
+        result
+#end parse_options
+
+corpus_options = ["broken=", "files=", "resolutions=", "seed="]
+
+#+
+# Mainline
+#-
+
+if __name__ == "__main__" :
+    opts, args = getopt.getopt(sys.argv[1:], "", corpus_options)
+    if len(args) != 1 :
+        raise getopt.GetoptError("need exactly one arg, the directory to create")
+    #end if
+    manifest = make_corpus(args[0], **parse_options(opts))
+    sys.stdout.write \
+      (
+            "%d .mhmat files, %d broken, written to %s\n"
+        %
+            (len(manifest["files"]), len(manifest["broken"]), args[0])
+      )
+#end if
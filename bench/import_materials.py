@@ -0,0 +1,87 @@
+#+
+# Times importing every .mhmat file in a corpus made by corpus.py, one
+# at a time through the material.import_mhmat operator, with profiling
+# enabled so the node building can be told apart from the parsing and
+# image loading. Run by run_bench.py as
+#
+#     blender --background --factory-startup --python bench/import_materials.py -- \
+#         «corpus» «results.json» [«storage»]
+#
+# where «storage» is the texture storage mode (default LINK). The
+# results are written as JSON to «results.json».
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import json
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import bpy
+import import_mhmat_material
+import corpus
+
+argv = sys.argv[sys.argv.index("--") + 1:]
+corpus_dir, results_file = argv[:2]
+storage = argv[2] if len(argv) > 2 else "LINK"
+manifest = corpus.load_manifest(corpus_dir)
+import_mhmat_material.register()
+phases = {}
+counters = {}
+nr_failed = 0
+with tempfile.TemporaryDirectory() as tempdir :
+    profile_file = os.path.join(tempdir, "profile.json")
+    start = time.perf_counter()
+    for filename in manifest["files"] :
+        try :
+            bpy.ops.material.import_mhmat \
+              (
+                filepath = os.path.join(corpus_dir, filename),
+                texture_storage = storage,
+                reuse_materials = False,
+                profile = True,
+                profile_file = profile_file
+              )
+        except RuntimeError :
+            # operator reported an error, e.g. missing texture
+            nr_failed += 1
+            continue
+        #end try
+        with open(profile_file, "rt") as infile :
+            profile = json.load(infile)
+        #end with
+        for name, entry in profile["phases"].items() :
+            total = phases.setdefault(name, {"seconds" : 0.0, "count" : 0})
+            total["seconds"] += entry["seconds"]
+            total["count"] += entry["count"]
+        #end for
+        for name, value in profile["counters"].items() :
+            counters[name] = counters.get(name, 0) + value
+        #end for
+    #end for
+    elapsed = time.perf_counter() - start
+#end with
+nr_files = len(manifest["files"])
+with open(results_file, "wt") as outfile :
+    json.dump \
+      (
+        {
+            "storage" : storage,
+            "files" : nr_files,
+            "failed" : nr_failed,
+            "seconds" : elapsed,
+            "files_per_second" : nr_files / elapsed,
+            "build_nodes_seconds" : phases.get("build_nodes", {}).get("seconds", 0.0),
+            "phases" : phases,
+            "counters" : counters,
+        },
+        outfile,
+        indent = 4
+      )
+    outfile.write("\n")
+#end with
@@ -0,0 +1,95 @@
+#+
+# Benchmark comparing building material node graphs from scratch with
+# copying them from templates. Run this with
+#
+#     blender --background --factory-startup --python bench/node_templates.py -- [«count»]
+#
+# where «count» is the number of materials to build each way
+# (default 1000).
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import itertools
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import bpy
+import import_mhmat_material
+from import_mhmat_material import \
+    mhmat, \
+    imagecache, \
+    nodes
+from corpus import \
+    write_png
+
+def make_corpus(dirname) :
+    # writes one .mhmat file for every combination of texture maps, and
+    # returns the list of their pathnames.
+    for map in nodes.MAP :
+        write_png(os.path.join(dirname, "%s.png" % map.name.lower()), 16, 16, 3)
+    #end for
+    result = []
+    for nr_maps in range(len(nodes.MAP) + 1) :
+        for maps in itertools.combinations(nodes.MAP, nr_maps) :
+            pathname = os.path.join \
+              (
+                dirname,
+                "combo_%s.mhmat" % ("_".join(map.name.lower() for map in maps) or "none")
+              )
+            with open(pathname, "wt") as outfile :
+                outfile.write("diffuseColor 0.8 0.6 0.5\nshininess 0.4\n")
+                for map in maps :
+                    outfile.write("%s %s.png\n" % (map.map_name, map.name.lower()))
+                    if map.intensity_name != None :
+                        outfile.write("%s 0.5\n" % map.intensity_name)
+                    #end if
+                #end for
+            #end with
+            result.append(pathname)
+        #end for
+    #end for
+    return \
+        result
+#end make_corpus
+
+def time_build(inputs, count, use_templates) :
+    for material in list(bpy.data.materials) :
+        bpy.data.materials.remove(material)
+    #end for
+    nodes.clear_templates()
+    start = time.perf_counter()
+    for settings, images in itertools.islice(itertools.cycle(inputs), count) :
+        nodes.make_material(settings, images, use_templates = use_templates)
+    #end for
+    return \
+        time.perf_counter() - start
+#end time_build
+
+#+
+# Mainline
+#-
+
+argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+count = int(argv[0]) if len(argv) != 0 else 1000
+with tempfile.TemporaryDirectory() as tempdir :
+    loader = imagecache.ImageLoader(storage = "LINK")
+    inputs = []
+    for pathname in make_corpus(tempdir) :
+        settings = mhmat.load(pathname)
+        inputs.append((settings, import_mhmat_material.load_material_images(settings, loader)))
+    #end for
+    from_scratch = time_build(inputs, count, use_templates = False)
+    from_templates = time_build(inputs, count, use_templates = True)
+#end with
+sys.stdout.write \
+  (
+        "%d materials (%d distinct definitions): from scratch %.3fs, from templates %.3fs, speedup %.1fx\n"
+    %
+        (count, len(inputs), from_scratch, from_templates, from_scratch / from_templates)
+  )
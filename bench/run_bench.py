@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+#+
+# Benchmark suite: times the .mhmat parser, the validate_mhmat script
+# and importing materials into Blender, each separately, over a
+# synthetic corpus from corpus.py, and writes the results as JSON so
+# runs can be compared across commits. Invoke as
+#
+#     python3 bench/run_bench.py [--corpus=«dir»] [--files=«n»] [--seed=«n»]
+#         [--resolutions=«r»,...] [--broken=«fraction»] [--jobs=«n»]
+#         [--repeat=«n»] [--blender=«path»] [--storage=«mode»] [--output=«file»]
+#
+# If --corpus names an existing corpus, that is used, otherwise one is
+# generated with the given options, in «dir» if specified (so it can be
+# reused by later runs), or else a temporary directory. --jobs is the
+# number of threads for load_all and validate_mhmat (default 4); each
+# timing is the best of --repeat runs (default 3). The import is only
+# timed if --blender gives the Blender executable to use; --storage is
+# the texture storage mode for it (default LINK). Results go to «file»
+# if --output is specified, otherwise stdout.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import time
+import json
+import platform
+import subprocess
+import tempfile
+import getopt
+
+bench_dir = os.path.dirname(os.path.realpath(__file__))
+top_dir = os.path.dirname(bench_dir)
+sys.path.insert(0, bench_dir)
+import corpus
+  # also puts the addon directory on sys.path
+import mhmat
+import textures
+
+def best_time(func, repeat) :
+    # returns the shortest time taken by repeat calls to func.
+    times = []
+    for i in range(repeat) :
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    #end for
+    return \
+        min(times)
+#end best_time
+
+def git_commit() :
+    # returns the current commit of the source tree, or None if unknown.
+    try :
+        result = subprocess.run \
+          (
+            ["git", "rev-parse", "HEAD"],
+            cwd = top_dir,
+            stdout = subprocess.PIPE,
+            stderr = subprocess.DEVNULL,
+            check = True
+          ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError) :
+        result = None
+    #end try
+    return \
+        result
+#end git_commit
+
+def bench_parse(filepaths, nr_workers, repeat) :
+    # times parsing alone, then parsing plus validation with and without
+    # the parse cache.
+
+    def parse_all() :
+        for filepath in filepaths :
+            try :
+                mhmat.parse(filepath)
+            except mhmat.Failure :
+                pass
+            #end try
+        #end for
+    #end parse_all
+
+    def load_all_cold() :
+        mhmat.clear_cache()
+        textures.probe.clear()
+        mhmat.load_all(filepaths, nr_workers)
+    #end load_all_cold
+
+    def load_all_warm() :
+        mhmat.load_all(filepaths, nr_workers)
+    #end load_all_warm
+
+#begin bench_parse
+    parse_seconds = best_time(parse_all, repeat)
+    return \
+        {
+            "files" : len(filepaths),
+            "parse_seconds" : parse_seconds,
+            "parse_files_per_second" : len(filepaths) / parse_seconds,
+            "load_all_seconds" : best_time(load_all_cold, repeat),
+            "load_all_cached_seconds" : best_time(load_all_warm, repeat),
+        }
+#end bench_parse
+
+def bench_validate(corpus_dir, nr_workers, repeat) :
+    # times validate_mhmat over the whole corpus, without a cache, and
+    # with a cache that is already up to date.
+    command = \
+        [
+            sys.executable, os.path.join(top_dir, "validate_mhmat"),
+            "--recursive=%s" % corpus_dir, "--jobs=%d" % nr_workers,
+        ]
+    status = []
+
+    def run(extra) :
+        status.append \
+          (
+            subprocess.run
+              (
+                command + extra,
+                stdout = subprocess.DEVNULL,
+                stderr = subprocess.DEVNULL
+              ).returncode
+          )
+    #end run
+
+#begin bench_validate
+    with tempfile.TemporaryDirectory(prefix = "mhmat_bench_") as cache_dir :
+        cache_args = ["--cache-dir=%s" % cache_dir]
+        run(cache_args) # fill the cache
+        result = \
+            {
+                "jobs" : nr_workers,
+                "seconds" : best_time(lambda : run([]), repeat),
+                "cached_seconds" : best_time(lambda : run(cache_args), repeat),
+                "exit_status" : status[-1],
+            }
+    #end with
+    return \
+        result
+#end bench_validate
+
+def bench_import(corpus_dir, blender, storage) :
+    # times importing every material in the corpus into Blender.
+    with tempfile.TemporaryDirectory(prefix = "mhmat_bench_") as tempdir :
+        results_file = os.path.join(tempdir, "import.json")
+        subprocess.run \
+          (
+            [
+                blender, "--background", "--factory-startup",
+                "--python-exit-code", "1",
+                "--python", os.path.join(bench_dir, "import_materials.py"),
+                "--", corpus_dir, results_file, storage,
+            ],
+            stdout = subprocess.DEVNULL,
+            check = True
+          )
+        with open(results_file, "rt") as infile :
+            result = json.load(infile)
+        #end with
+    #end with
+    return \
+        result
+#end bench_import
+
+def run_benchmarks(corpus_dir, nr_workers, repeat, blender, storage) :
+    manifest = corpus.load_manifest(corpus_dir)
+    filepaths = list(os.path.join(corpus_dir, f) for f in manifest["files"])
+    results = \
+        {
+            "commit" : git_commit(),
+            "started" : time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python" : platform.python_version(),
+            "platform" : platform.platform(),
+            "corpus" : dict(manifest["params"], version = manifest["version"]),
+            "repeat" : repeat,
+            "parse" : bench_parse(filepaths, nr_workers, repeat),
+            "validate_mhmat" : bench_validate(corpus_dir, nr_workers, repeat),
+            "import" : None,
+        }
+    if blender != None :
+        results["import"] = bench_import(corpus_dir, blender, storage)
+    #end if
+    return \
+        results
+#end run_benchmarks
+
+#+
+# Mainline
+#-
+
+opts, args = getopt.getopt \
+  (
+    sys.argv[1:],
+    "",
+    corpus.corpus_options + ["blender=", "corpus=", "jobs=", "output=", "repeat=", "storage="]
+  )
+if len(args) != 0 :
+    raise getopt.GetoptError("unexpected args: %s" % " ".join(args))
+#end if
+corpus_dir = None
+nr_workers = 4
+repeat = 3
+blender = None
+storage = "LINK"
+output = None
+for keyword, value in opts :
+    if keyword == "--corpus" :
+        corpus_dir = value
+    elif keyword == "--jobs" :
+        nr_workers = int(value)
+    elif keyword == "--repeat" :
+        repeat = int(value)
+    elif keyword == "--blender" :
+        blender = value
+    elif keyword == "--storage" :
+        storage = value
+    elif keyword == "--output" :
+        output = value
+    #end if
+#end for
+with tempfile.TemporaryDirectory(prefix = "mhmat_bench_") as tempdir :
+    if corpus_dir == None :
+        corpus_dir = os.path.join(tempdir, "corpus")
+    #end if
+    corpus_dir = os.path.abspath(corpus_dir)
+    if not os.path.exists(corpus_dir) :
+        corpus.make_corpus(corpus_dir, **corpus.parse_options(opts))
+    #end if
+    results = run_benchmarks(corpus_dir, nr_workers, repeat, blender, storage)
+#end with
+if output != None :
+    with open(output, "wt") as outfile :
+        json.dump(results, outfile, indent = 4)
+        outfile.write("\n")
+    #end with
+else :
+    json.dump(results, sys.stdout, indent = 4)
+    sys.stdout.write("\n")
+#end if
@@ -0,0 +1,298 @@
+#+
+# A lightweight stand-in for Blender’s bpy module, modelling just
+# enough of bpy.data.materials, bpy.data.images and shader node trees
+# to run the import_mhmat_material addon outside Blender. Put the
+# parent directory of this package on sys.path ahead of everything
+# else to use it.
+#
+# RNA-equivalent calls and allocated bytes are counted in
+# bpy.types.stats, and fakebpy/snapshot.py can save and compare
+# golden snapshots of material node graphs.
+#-
+
+import os
+import json
+import types as _types
+from . import \
+    props, \
+    types, \
+    utils, \
+    path, \
+    app, \
+    ops
+
+class _BlendData :
+
+    def __init__(self) :
+        self.reset()
+    #end __init__
+
+    def reset(self) :
+        self.materials = types.BlendDataCollection(types.Material)
+        self.images = types.BlendDataImages()
+        self.node_groups = types.BlendDataCollection(types.NodeTree)
+        self.objects = types.BlendDataCollection(types.Object)
+        self.meshes = types.BlendDataCollection(types.Mesh)
+        self.libraries = _Libraries(self)
+        self.scenes = types.BlendDataCollection(types.Scene)
+        self.scenes.new("Scene")
+        self.window_managers = types.bpy_prop_collection()
+        self.window_managers._items.append(types.WindowManager())
+        self.window_managers[0].name = "WinMan"
+        self.filepath = ""
+        self.is_saved = False
+        self.is_dirty = False
+    #end reset
+
+    def orphans_purge(self) :
+        for coll in (self.materials, self.images, self.node_groups) :
+            for item in list(coll) :
+                if item.users == 0 :
+                    coll.remove(item)
+                #end if
+            #end for
+        #end for
+    #end orphans_purge
+
+#end _BlendData
+
+class _Libraries(types.BlendDataCollection) :
+
+    def __init__(self, blend_data) :
+        super().__init__(types.Library)
+        self._blend_data = blend_data
+    #end __init__
+
+    def load(self, filepath, link = False, relative = False, assets_only = False) :
+        return \
+            _LibraryLoader(self._blend_data, filepath, link)
+    #end load
+
+    def write(self, filepath, datablocks, path_remap = "NONE", fake_user = False, compress = False) :
+        _write_blend(filepath, datablocks)
+    #end write
+
+#end _Libraries
+
+class _LibraryLoader :
+    # fake “.blend” files are JSON lists of datablocks, see _write_blend.
+
+    def __init__(self, blend_data, filepath, link) :
+        self.blend_data = blend_data
+        self.filepath = filepath
+        self.link = link
+    #end __init__
+
+    def __enter__(self) :
+        self.contents = _read_blend(self.filepath)
+        self.data_from = _types.SimpleNamespace \
+          (
+            materials = list(e["name"] for e in self.contents["materials"]),
+            images = list(e["name"] for e in self.contents["images"]),
+          )
+        self.data_to = _types.SimpleNamespace(materials = [], images = [])
+        return \
+            self.data_from, self.data_to
+    #end __enter__
+
+    def __exit__(self, *args) :
+        for attr in ("materials", "images") :
+            entries = dict((e["name"], e) for e in self.contents[attr])
+            loaded = []
+            for name in getattr(self.data_to, attr) :
+                if isinstance(name, str) :
+                    loaded.append(_restore(getattr(self.blend_data, attr), entries[name]))
+                #end if
+            #end for
+            setattr(self.data_to, attr, loaded)
+        #end for
+    #end __exit__
+
+#end _LibraryLoader
+
+def _write_blend(filepath, datablocks) :
+    # saves the names and custom properties of the materials and images
+    # among datablocks. That is all the addon needs to find again.
+    contents = {"materials" : [], "images" : []}
+    for item in datablocks :
+        if isinstance(item, types.Material) :
+            attr = "materials"
+        elif isinstance(item, types.Image) :
+            attr = "images"
+        else :
+            attr = None
+        #end if
+        if attr != None :
+            contents[attr].append \
+              (
+                {
+                    "name" : item.name,
+                    "props" : dict(item._idprops()),
+                    "filepath" : getattr(item, "filepath", ""),
+                }
+              )
+        #end if
+    #end for
+    with open(filepath, "wt") as outfile :
+        json.dump(contents, outfile)
+    #end with
+#end _write_blend
+
+def _read_blend(filepath) :
+    try :
+        with open(filepath, "rt") as infile :
+            contents = json.load(infile)
+        #end with
+    except (OSError, ValueError) :
+        contents = {}
+    #end try
+    for attr in ("materials", "images") :
+        contents.setdefault(attr, [])
+    #end for
+    return \
+        contents
+#end _read_blend
+
+def _restore(collection, entry) :
+    # recreates a datablock saved by _write_blend.
+    item = collection.new(entry["name"])
+    item.use_fake_user = True
+    item._idprops().update(entry["props"])
+    if entry["filepath"] != "" :
+        item.filepath = entry["filepath"]
+    #end if
+    return \
+        item
+#end _restore
+
+def _open_mainfile(filepath, **kwargs) :
+    data.reset()
+    context.reset()
+    contents = _read_blend(filepath)
+    for attr in ("materials", "images") :
+        for entry in contents[attr] :
+            _restore(getattr(data, attr), entry)
+        #end for
+    #end for
+    data.filepath = os.path.abspath(filepath)
+    data.is_saved = True
+    return \
+        {"FINISHED"}
+#end _open_mainfile
+
+def _save_as_mainfile(filepath = None, **kwargs) :
+    filepath = filepath or data.filepath
+    _write_blend(filepath, list(data.materials) + list(data.images))
+    data.filepath = os.path.abspath(filepath)
+    data.is_saved = True
+    data.is_dirty = False
+    return \
+        {"FINISHED"}
+#end _save_as_mainfile
+
+def _obj_import(filepath, **kwargs) :
+    # models just what the OBJ importer does to the .blend file: one mesh
+    # object for each “o” line (or one for the whole file if there are
+    # none), with a material slot for each material named by a “usemtl”
+    # line, and the new objects selected. No geometry is read.
+    try :
+        with open(filepath, "rt", errors = "replace") as infile :
+            lines = list(infile)
+        #end with
+    except OSError as why :
+        raise RuntimeError("Error: Cannot open file %s: %s\n" % (filepath, why.strerror))
+    #end try
+    objects = []
+    for line in lines :
+        words = line.split()
+        if len(words) != 0 and words[0] in ("o", "usemtl") :
+            if words[0] == "o" or len(objects) == 0 :
+                name = " ".join(words[1:]) or os.path.splitext(os.path.basename(filepath))[0]
+                obj = data.objects.new(name, data.meshes.new(name))
+                objects.append(obj)
+            #end if
+            if words[0] == "usemtl" :
+                name = " ".join(words[1:])
+                material = data.materials.get(name)
+                if material == None :
+                    material = data.materials.new(name)
+                #end if
+                objects[-1].data.materials.append(material)
+            #end if
+        #end if
+    #end for
+    if len(objects) == 0 :
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        obj = data.objects.new(name, data.meshes.new(name))
+        objects.append(obj)
+    #end if
+    for obj in objects :
+        obj.select_set(True)
+    #end for
+    context.selected_objects[:] = objects
+    return \
+        {"FINISHED"}
+#end _obj_import
+
+data = _BlendData()
+
+class _Context :
+
+    def __init__(self) :
+        self.reset()
+    #end __init__
+
+    def reset(self) :
+        self.scene = data.scenes[0]
+        self.window_manager = data.window_managers[0]
+        self.workspace = _Workspace()
+        self.window = None
+        self.area = None
+        self.object = None
+        self.active_object = None
+        self.selected_objects = []
+        self.material = None
+        self.preferences = _Preferences()
+    #end reset
+
+    def evaluated_depsgraph_get(self) :
+        return \
+            None
+    #end evaluated_depsgraph_get
+
+#end _Context
+
+class _Workspace :
+
+    def __init__(self) :
+        self.status_text = None
+    #end __init__
+
+    def status_text_set(self, text) :
+        self.status_text = text
+    #end status_text_set
+
+#end _Workspace
+
+class _Preferences :
+
+    def __init__(self) :
+        self.addons = types.bpy_prop_collection()
+    #end __init__
+
+#end _Preferences
+
+context = _Context()
+
+ops.handlers["wm.open_mainfile"] = _open_mainfile
+ops.handlers["wm.save_as_mainfile"] = _save_as_mainfile
+ops.handlers["wm.save_mainfile"] = _save_as_mainfile
+ops.handlers["wm.obj_import"] = _obj_import
+
+def reset() :
+    # restores all fake state to that of an empty .blend file.
+    data.reset()
+    context.reset()
+    types.stats.reset()
+    app.timers.reset()
+#end reset
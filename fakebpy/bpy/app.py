@@ -0,0 +1,47 @@
+#+
+# Fake bpy.app. Timer functions are not run automatically; call
+# timers.run_pending() to invoke those that are due.
+#-
+
+import sys
+
+version = (4, 1, 0)
+version_string = "4.1.0 (fakebpy)"
+binary_path = sys.executable
+background = True
+
+class _Timers :
+
+    def __init__(self) :
+        self.reset()
+    #end __init__
+
+    def reset(self) :
+        self.registered = []
+    #end reset
+
+    def register(self, function, first_interval = 0, persistent = False) :
+        self.registered.append(function)
+    #end register
+
+    def unregister(self, function) :
+        self.registered.remove(function)
+    #end unregister
+
+    def is_registered(self, function) :
+        return \
+            function in self.registered
+    #end is_registered
+
+    def run_pending(self) :
+        for function in list(self.registered) :
+            interval = function()
+            if interval == None :
+                self.registered.remove(function)
+            #end if
+        #end for
+    #end run_pending
+
+#end _Timers
+
+timers = _Timers()
@@ -0,0 +1,87 @@
+#+
+# Fake bpy.ops: operator calls are recorded in the calls list. A call
+# is passed to the handler installed for it in the handlers dict, if
+# any, keyed by "«category».«name»"; otherwise an operator class
+# registered with that bl_idname is instantiated and executed, as
+# Blender does for operators invoked from scripts; otherwise the call
+# raises AttributeError, as for an operator that does not exist, so a
+# code path needing an operator that is not modelled fails loudly
+# instead of appearing to succeed.
+#-
+
+import traceback
+
+calls = []
+handlers = {}
+operators = {} # bl_idname => registered Operator subclass
+
+def _execute(ċlass, kwargs) :
+    # runs a registered operator class the way Blender would for a call
+    # from a script: errors, whether reported by the operator or raised
+    # as exceptions, become RuntimeError.
+    from . import context
+    from .types import bpy_prop_collection
+    operator = ċlass()
+    for name, value in kwargs.items() :
+        current = getattr(operator, name, None)
+        if isinstance(current, bpy_prop_collection) :
+            for entry in value :
+                item = current.add()
+                for key, val in entry.items() :
+                    setattr(item, key, val)
+                #end for
+            #end for
+        else :
+            setattr(operator, name, value)
+        #end if
+    #end for
+    try :
+        result = operator.execute(context)
+    except Exception :
+        raise RuntimeError("Error: Python: %s" % traceback.format_exc())
+    #end try
+    errors = list(msg for types, msg in operator.reports if "ERROR" in types)
+    if len(errors) != 0 :
+        raise RuntimeError("Error: %s\n" % "\n".join(errors))
+    #end if
+    return \
+        result
+#end _execute
+
+class _OpCategory :
+
+    def __init__(self, category) :
+        self._category = category
+    #end __init__
+
+    def __getattr__(self, name) :
+        opname = "%s.%s" % (self._category, name)
+
+        def call(*args, **kwargs) :
+            calls.append((opname, kwargs))
+            handler = handlers.get(opname)
+            if handler != None :
+                result = handler(**kwargs)
+            elif opname in operators :
+                result = _execute(operators[opname], kwargs)
+            else :
+                raise AttributeError \
+                  (
+                    "Calling operator \"bpy.ops.%s\" error, could not be found" % opname
+                  )
+            #end if
+            return \
+                result
+        #end call
+
+    #begin __getattr__
+        return \
+            call
+    #end __getattr__
+
+#end _OpCategory
+
+def __getattr__(category) :
+    return \
+        _OpCategory(category)
+#end __getattr__
@@ -0,0 +1,40 @@
+#+
+# Fake bpy.path: “//”-prefixed paths are relative to the directory of
+# the current .blend file.
+#-
+
+import os
+
+def abspath(path, start = None) :
+    if path.startswith("//") :
+        if start == None :
+            from . import data
+            start = os.path.dirname(data.filepath)
+        #end if
+        path = os.path.join(start, path[2:])
+    #end if
+    return \
+        os.path.abspath(path)
+#end abspath
+
+def relpath(path, start = None) :
+    if start == None :
+        from . import data
+        start = os.path.dirname(data.filepath)
+    #end if
+    if start != "" and not path.startswith("//") :
+        path = "//" + os.path.relpath(path, start)
+    #end if
+    return \
+        path
+#end relpath
+
+def basename(path) :
+    return \
+        os.path.basename(path[2:] if path.startswith("//") else path)
+#end basename
+
+def clean_name(name, replace = "_") :
+    return \
+        "".join((c, replace)[not (c.isalnum() or c in "-.")] for c in name)
+#end clean_name
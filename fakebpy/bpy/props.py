@@ -0,0 +1,123 @@
+#+
+# Fake bpy.props: the property functions just record their arguments,
+# so that operator and property-group instances can be given the
+# declared default values.
+#-
+
+class _PropertyDeferred :
+
+    __slots__ = ("function", "keywords")
+
+    def __init__(self, function, keywords) :
+        self.function = function
+        self.keywords = keywords
+    #end __init__
+
+    def default_value(self) :
+        if self.function == "CollectionProperty" :
+            from .types import bpy_prop_collection
+            result = bpy_prop_collection(self.keywords.get("type"))
+        elif self.function == "PointerProperty" :
+            result = self.keywords["type"]()
+        elif "default" in self.keywords :
+            result = self.keywords["default"]
+            if isinstance(result, set) :
+                result = set(result)
+            #end if
+        elif self.function == "EnumProperty" :
+            items = self.keywords["items"]
+            if callable(items) :
+                result = ""
+            elif "ENUM_FLAG" in self.keywords.get("options", ()) :
+                result = set()
+            else :
+                result = items[0][0]
+            #end if
+        else :
+            result = \
+                {
+                    "BoolProperty" : False,
+                    "IntProperty" : 0,
+                    "FloatProperty" : 0.0,
+                    "StringProperty" : "",
+                    "FloatVectorProperty" : (0.0, 0.0, 0.0),
+                }[self.function]
+        #end if
+        return \
+            result
+    #end default_value
+
+    # Properties added to a class after it is defined, as in
+    # «bpy.types.WindowManager.«name» = PointerProperty(...)», behave as
+    # descriptors giving each instance its own value.
+
+    def __get__(self, obj, objtype = None) :
+        if obj != None :
+            values = obj.__dict__.setdefault("_deferred_values", {})
+            if self not in values :
+                values[self] = self.default_value()
+            #end if
+            result = values[self]
+        else :
+            result = self
+        #end if
+        return \
+            result
+    #end __get__
+
+    def __set__(self, obj, value) :
+        obj.__dict__.setdefault("_deferred_values", {})[self] = value
+    #end __set__
+
+    def __repr__(self) :
+        return \
+            "%s(%s)" % (self.function, ", ".join("%s = %r" % i for i in self.keywords.items()))
+    #end __repr__
+
+#end _PropertyDeferred
+
+def _def_property(function) :
+
+    def make(**kwargs) :
+        return \
+            _PropertyDeferred(function, kwargs)
+    #end make
+
+#begin _def_property
+    make.__name__ = function
+    return \
+        make
+#end _def_property
+
+BoolProperty = _def_property("BoolProperty")
+IntProperty = _def_property("IntProperty")
+FloatProperty = _def_property("FloatProperty")
+FloatVectorProperty = _def_property("FloatVectorProperty")
+StringProperty = _def_property("StringProperty")
+EnumProperty = _def_property("EnumProperty")
+CollectionProperty = _def_property("CollectionProperty")
+PointerProperty = _def_property("PointerProperty")
+
+def init_properties(obj) :
+    # gives obj attributes initialized to the defaults of all properties
+    # declared as annotations on its class or its mixin base classes. Like
+    # Blender, this does not look at bases that are themselves bpy_struct
+    # subclasses (e.g. another operator), nor at any of their bases.
+    from .types import bpy_struct
+
+    def collect(ċlass) :
+        for base in ċlass.__bases__ :
+            if not issubclass(base, bpy_struct) :
+                collect(base)
+            #end if
+        #end for
+        for name, prop in ċlass.__dict__.get("__annotations__", {}).items() :
+            if isinstance(prop, _PropertyDeferred) :
+                object.__setattr__(obj, name, prop.default_value())
+            #end if
+        #end for
+    #end collect
+
+#begin init_properties
+    collect(type(obj))
+#end init_properties
@@ -0,0 +1,1116 @@
+#+
+# Fake bpy.types: just enough of Blender’s data model to drive the
+# import_mhmat_material addon. Every operation that would be an RNA
+# call in real Blender is counted in stats.
+#-
+
+import os
+from . import \
+    props
+
+#+
+# Instrumentation
+#-
+
+class Stats :
+
+    __slots__ = ("calls", "allocated_bytes")
+
+    def __init__(self) :
+        self.reset()
+    #end __init__
+
+    def reset(self) :
+        self.calls = {}
+        self.allocated_bytes = 0
+    #end reset
+
+    def count(self, what, n = 1) :
+        self.calls[what] = self.calls.get(what, 0) + n
+    #end count
+
+    def allocate(self, nr_bytes) :
+        self.allocated_bytes += nr_bytes
+    #end allocate
+
+    @property
+    def total_calls(self) :
+        return \
+            sum(self.calls.values())
+    #end total_calls
+
+    def as_dict(self) :
+        return \
+            {
+                "calls" : dict(sorted(self.calls.items())),
+                "total_calls" : self.total_calls,
+                "allocated_bytes" : self.allocated_bytes,
+            }
+    #end as_dict
+
+#end Stats
+
+stats = Stats()
+
+#+
+# Generic collections
+#-
+
+class bpy_prop_collection :
+    # ordered collection of items that can be indexed by position or by name.
+
+    def __init__(self, item_type = None) :
+        self._items = []
+        self._item_type = item_type
+    #end __init__
+
+    def __len__(self) :
+        return \
+            len(self._items)
+    #end __len__
+
+    def __iter__(self) :
+        return \
+            iter(list(self._items))
+    #end __iter__
+
+    def __bool__(self) :
+        return \
+            True
+    #end __bool__
+
+    def __getitem__(self, key) :
+        if isinstance(key, str) :
+            for item in self._items :
+                if item.name == key :
+                    result = item
+                    break
+                #end if
+            else :
+                raise KeyError("key %s not found" % repr(key))
+            #end for
+        else :
+            result = self._items[key]
+        #end if
+        return \
+            result
+    #end __getitem__
+
+    def __contains__(self, key) :
+        return \
+            any(item.name == key for item in self._items)
+    #end __contains__
+
+    def get(self, key, default = None) :
+        try :
+            result = self[key]
+        except KeyError :
+            result = default
+        #end try
+        return \
+            result
+    #end get
+
+    def keys(self) :
+        return \
+            list(item.name for item in self._items)
+    #end keys
+
+    def values(self) :
+        return \
+            list(self._items)
+    #end values
+
+    def items(self) :
+        return \
+            list((item.name, item) for item in self._items)
+    #end items
+
+    def add(self) :
+        # for CollectionProperty-style collections
+        item = self._item_type()
+        self._items.append(item)
+        return \
+            item
+    #end add
+
+    def clear(self) :
+        self._items.clear()
+    #end clear
+
+    def remove(self, item) :
+        if isinstance(item, int) :
+            del self._items[item]
+        else :
+            self._items.remove(item)
+        #end if
+    #end remove
+
+#end bpy_prop_collection
+
+class _IDProperties :
+    # mixin providing custom-property access via item syntax.
+
+    def _idprops(self) :
+        try :
+            result = object.__getattribute__(self, "_idprops_dict")
+        except AttributeError :
+            result = {}
+            object.__setattr__(self, "_idprops_dict", result)
+        #end try
+        return \
+            result
+    #end _idprops
+
+    def __getitem__(self, key) :
+        stats.count("idprop_get")
+        return \
+            self._idprops()[key]
+    #end __getitem__
+
+    def __setitem__(self, key, value) :
+        stats.count("idprop_set")
+        self._idprops()[key] = value
+    #end __setitem__
+
+    def __delitem__(self, key) :
+        del self._idprops()[key]
+    #end __delitem__
+
+    def __contains__(self, key) :
+        return \
+            key in self._idprops()
+    #end __contains__
+
+    def get(self, key, default = None) :
+        stats.count("idprop_get")
+        return \
+            self._idprops().get(key, default)
+    #end get
+
+    def keys(self) :
+        return \
+            self._idprops().keys()
+    #end keys
+
+#end _IDProperties
+
+#+
+# Datablocks
+#-
+
+class ID(_IDProperties) :
+
+    def __init__(self, name) :
+        self.name = name
+        self.use_fake_user = False
+        self.library = None
+        self.asset_data = None
+        self.tag = False
+    #end __init__
+
+    @property
+    def users(self) :
+        return \
+            self._count_users() + int(self.use_fake_user)
+    #end users
+
+    def _count_users(self) :
+        return \
+            0
+    #end _count_users
+
+    def asset_mark(self) :
+        self.asset_data = {}
+    #end asset_mark
+
+    def user_remap(self, new_id) :
+        pass
+    #end user_remap
+
+    def __repr__(self) :
+        return \
+            "<%s %s>" % (type(self).__name__, repr(self.name))
+    #end __repr__
+
+#end ID
+
+class BlendDataCollection(bpy_prop_collection) :
+    # one of the bpy.data collections; maintains unique datablock names.
+
+    def __init__(self, id_type) :
+        super().__init__(id_type)
+    #end __init__
+
+    def _unique_name(self, name, exclude = None) :
+        name = name[:63]
+        existing = set(i.name for i in self._items if i is not exclude)
+        result = name
+        seq = 0
+        while result in existing :
+            seq += 1
+            result = "%s.%03d" % (name, seq)
+        #end while
+        return \
+            result
+    #end _unique_name
+
+    def _add(self, item) :
+        item._collection = self
+        object.__setattr__(item, "name", self._unique_name(item.name))
+        self._items.append(item)
+        return \
+            item
+    #end _add
+
+    def new(self, name, *args, **kwargs) :
+        stats.count("%s.new" % self._item_type.__name__)
+        return \
+            self._add(self._item_type(name, *args, **kwargs))
+    #end new
+
+    def remove(self, item, do_unlink = True) :
+        stats.count("%s.remove" % self._item_type.__name__)
+        self._items.remove(item)
+    #end remove
+
+#end BlendDataCollection
+
+class _Named :
+    # enforces unique names within owning collection on rename.
+
+    def __setattr__(self, attr, value) :
+        if attr == "name" and getattr(self, "_collection", None) != None :
+            value = self._collection._unique_name(value, exclude = self)
+        #end if
+        object.__setattr__(self, attr, value)
+    #end __setattr__
+
+#end _Named
+
+class ColorManagedInputColorspaceSettings :
+
+    def __init__(self) :
+        self.name = "sRGB"
+    #end __init__
+
+#end ColorManagedInputColorspaceSettings
+
+class PackedFile :
+
+    def __init__(self, data, filepath) :
+        self.data = data
+        self.size = len(data)
+        self.filepath = filepath
+    #end __init__
+
+#end PackedFile
+
+def _png_size(data) :
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24 :
+        result = (int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big"))
+    else :
+        result = (1, 1)
+    #end if
+    return \
+        result
+#end _png_size
+
+class Image(_Named, ID) :
+
+    def __init__(self, name, width = 1, height = 1, alpha = False, float_buffer = False, is_data = False) :
+        ID.__init__(self, name)
+        self.filepath = ""
+        self.filepath_raw = ""
+        self.source = "GENERATED"
+        self.file_format = "PNG"
+        self.colorspace_settings = ColorManagedInputColorspaceSettings()
+        self.alpha_mode = "STRAIGHT"
+        self.packed_file = None
+        self.packed_files = bpy_prop_collection()
+        self.size = (width, height)
+        self.channels = 4
+        self.depth = 32
+        self._pixels = None
+        stats.allocate(width * height * 4 * 4)
+    #end __init__
+
+    def _count_users(self) :
+        from . import data
+        count = 0
+        for material in data.materials :
+            if material.node_tree != None :
+                for node in material.node_tree.nodes :
+                    if getattr(node, "image", None) is self :
+                        count += 1
+                    #end if
+                #end for
+            #end if
+        #end for
+        return \
+            count
+    #end _count_users
+
+    @property
+    def has_data(self) :
+        return \
+            True
+    #end has_data
+
+    @property
+    def pixels(self) :
+        if self._pixels == None :
+            self._pixels = _Pixels([0.0] * (self.size[0] * self.size[1] * 4))
+        #end if
+        return \
+            self._pixels
+    #end pixels
+
+    @pixels.setter
+    def pixels(self, value) :
+        self._pixels = _Pixels(list(value))
+    #end pixels
+
+    def pack(self) :
+        stats.count("Image.pack")
+        if self.filepath != "" :
+            from . import path
+            data = open(path.abspath(self.filepath), "rb").read()
+        else :
+            data = b"\0" * (self.size[0] * self.size[1] * 4)
+        #end if
+        stats.allocate(len(data))
+        self.packed_file = PackedFile(data, self.filepath)
+        self.packed_files._items = [self.packed_file]
+    #end pack
+
+    def unpack(self, method = "USE_LOCAL") :
+        stats.count("Image.unpack")
+        if method in ("USE_ORIGINAL", "WRITE_ORIGINAL") and self.packed_file != None :
+            from . import path
+            dest = path.abspath(self.filepath)
+            if method == "WRITE_ORIGINAL" or not os.path.exists(dest) :
+                os.makedirs(os.path.dirname(dest), exist_ok = True)
+                with open(dest, "wb") as outfile :
+                    outfile.write(self.packed_file.data)
+                #end with
+            #end if
+        #end if
+        self.packed_file = None
+        self.packed_files._items = []
+    #end unpack
+
+    def reload(self) :
+        stats.count("Image.reload")
+    #end reload
+
+    def scale(self, width, height) :
+        stats.count("Image.scale")
+        self.size = (width, height)
+        self._pixels = None
+    #end scale
+
+    def save(self, filepath = None, quality = 90) :
+        stats.count("Image.save")
+        from . import path
+        dest = path.abspath(filepath or self.filepath_raw or self.filepath)
+        with open(dest, "wb") as outfile :
+            outfile.write(b"\x89PNG\r\n\x1a\n" + b"\0\0\0\x0dIHDR" + self.size[0].to_bytes(4, "big") + self.size[1].to_bytes(4, "big"))
+        #end with
+    #end save
+
+    def save_render(self, filepath, scene = None) :
+        self.save(filepath = filepath)
+    #end save_render
+
+    def update(self) :
+        stats.count("Image.update")
+    #end update
+
+    def copy(self) :
+        result = Image(self.name, *self.size)
+        result.__dict__.update(dict((k, v) for k, v in self.__dict__.items() if k not in ("name", "_collection")))
+        return \
+            self._collection._add(result)
+    #end copy
+
+#end Image
+
+class _Pixels(list) :
+
+    def foreach_get(self, dest) :
+        dest[:] = self
+    #end foreach_get
+
+    def foreach_set(self, src) :
+        self[:] = list(src)
+    #end foreach_set
+
+#end _Pixels
+
+class BlendDataImages(BlendDataCollection) :
+
+    def __init__(self) :
+        super().__init__(Image)
+    #end __init__
+
+    def load(self, filepath, check_existing = False) :
+        stats.count("Image.load")
+        from . import path
+        if check_existing :
+            for image in self._items :
+                if image.filepath != "" and path.abspath(image.filepath) == os.path.abspath(filepath) :
+                    return \
+                        image
+                #end if
+            #end for
+        #end if
+        try :
+            with open(filepath, "rb") as infile :
+                head = infile.read(32)
+            #end with
+        except OSError as err :
+            raise RuntimeError("Error: Cannot read image %s: %s" % (repr(filepath), err.strerror))
+        #end try
+        width, height = _png_size(head)
+        image = Image(os.path.basename(filepath), width, height)
+        image.source = "FILE"
+        image.filepath = filepath
+        image.filepath_raw = filepath
+        image.file_format = os.path.splitext(filepath)[1][1:].upper() or "PNG"
+        return \
+            self._add(image)
+    #end load
+
+#end BlendDataImages
+
+#+
+# Node trees
+#-
+
+class NodeSocket :
+
+    def __init__(self, node, name, identifier, is_output, default_value) :
+        self.node = node
+        self.name = name
+        self.identifier = identifier
+        self.is_output = is_output
+        self._default_value = default_value
+        self.enabled = True
+        self.hide = False
+    #end __init__
+
+    @property
+    def default_value(self) :
+        return \
+            self._default_value
+    #end default_value
+
+    @default_value.setter
+    def default_value(self, value) :
+        stats.count("NodeSocket.default_value")
+        if isinstance(self._default_value, tuple) :
+            value = tuple(value)
+            if len(value) != len(self._default_value) :
+                raise ValueError \
+                  (
+                        "bpy_struct: item.attr = val: sequences of dimension 0 should contain %d items, not %d"
+                    %
+                        (len(self._default_value), len(value))
+                  )
+            #end if
+        elif self._default_value != None :
+            value = float(value)
+        #end if
+        self._default_value = value
+    #end default_value
+
+    @property
+    def is_linked(self) :
+        tree = self.node.id_data
+        return \
+            any(l.to_socket is self or l.from_socket is self for l in tree.links)
+    #end is_linked
+
+    @property
+    def links(self) :
+        tree = self.node.id_data
+        return \
+            list(l for l in tree.links if l.to_socket is self or l.from_socket is self)
+    #end links
+
+    def __repr__(self) :
+        return \
+            "<NodeSocket %s.%s>" % (self.node.name, self.name)
+    #end __repr__
+
+#end NodeSocket
+
+class NodeSockets(bpy_prop_collection) :
+    pass
+#end NodeSockets
+
+FLOAT = 0.0
+COLOUR = (0.0, 0.0, 0.0, 1.0)
+VECTOR = (0.0, 0.0, 0.0)
+SHADER = None
+
+node_socket_defs = \
+    { # node type => (inputs, outputs), each a sequence of (name, default)
+        "ShaderNodeTexCoord" :
+            (
+                (),
+                (
+                    ("Generated", VECTOR), ("Normal", VECTOR), ("UV", VECTOR),
+                    ("Object", VECTOR), ("Camera", VECTOR), ("Window", VECTOR),
+                    ("Reflection", VECTOR),
+                ),
+            ),
+        "ShaderNodeMapping" :
+            (
+                (
+                    ("Vector", VECTOR), ("Location", VECTOR), ("Rotation", VECTOR),
+                    ("Scale", (1.0, 1.0, 1.0)),
+                ),
+                (("Vector", VECTOR),),
+            ),
+        "NodeReroute" :
+            (
+                (("Input", COLOUR),),
+                (("Output", COLOUR),),
+            ),
+        "ShaderNodeBsdfPrincipled" :
+            (
+                (
+                    ("Base Color", (0.8, 0.8, 0.8, 1.0)), ("Metallic", FLOAT),
+                    ("Roughness", 0.5), ("IOR", 1.45), ("Alpha", 1.0), ("Normal", VECTOR),
+                    ("Weight", FLOAT), ("Subsurface Weight", FLOAT),
+                    ("Subsurface Radius", (1.0, 0.2, 0.1)), ("Subsurface Scale", 0.05),
+                    ("Subsurface IOR", 1.4), ("Subsurface Anisotropy", FLOAT),
+                    ("Specular IOR Level", 0.5), ("Specular Tint", (1.0, 1.0, 1.0, 1.0)),
+                    ("Anisotropic", FLOAT), ("Anisotropic Rotation", FLOAT),
+                    ("Tangent", VECTOR), ("Transmission Weight", FLOAT),
+                    ("Coat Weight", FLOAT), ("Coat Roughness", 0.03), ("Coat IOR", 1.5),
+                    ("Coat Tint", (1.0, 1.0, 1.0, 1.0)), ("Coat Normal", VECTOR),
+                    ("Sheen Weight", FLOAT), ("Sheen Roughness", 0.5),
+                    ("Sheen Tint", (1.0, 1.0, 1.0, 1.0)), ("Emission Color", (1.0, 1.0, 1.0, 1.0)),
+                    ("Emission Strength", FLOAT),
+                ),
+                (("BSDF", SHADER),),
+            ),
+        "ShaderNodeOutputMaterial" :
+            (
+                (
+                    ("Surface", SHADER), ("Volume", SHADER), ("Displacement", VECTOR),
+                    ("Thickness", FLOAT),
+                ),
+                (),
+            ),
+        "ShaderNodeTexImage" :
+            (
+                (("Vector", VECTOR),),
+                (("Color", COLOUR), ("Alpha", FLOAT)),
+            ),
+        "ShaderNodeMath" :
+            (
+                (("Value", 0.5), ("Value", 0.5), ("Value", 0.5)),
+                (("Value", FLOAT),),
+            ),
+        "ShaderNodeBump" :
+            (
+                (("Strength", 1.0), ("Distance", 1.0), ("Height", 1.0), ("Normal", VECTOR)),
+                (("Normal", VECTOR),),
+            ),
+        "ShaderNodeNormalMap" :
+            (
+                (("Strength", 1.0), ("Color", (0.5, 0.5, 1.0, 1.0))),
+                (("Normal", VECTOR),),
+            ),
+        "ShaderNodeSeparateColor" :
+            (
+                (("Color", (0.8, 0.8, 0.8, 1.0)),),
+                (("Red", FLOAT), ("Green", FLOAT), ("Blue", FLOAT)),
+            ),
+        "ShaderNodeDisplacement" :
+            (
+                (("Height", FLOAT), ("Midlevel", 0.5), ("Scale", 1.0), ("Normal", VECTOR)),
+                (("Displacement", VECTOR),),
+            ),
+    }
+
+class Node(_IDProperties) :
+
+    def __init__(self, tree, bl_idname) :
+        self.id_data = tree
+        self.bl_idname = bl_idname
+        self.type = bl_idname
+        self.name = bl_idname
+        self.label = ""
+        self.location = (0.0, 0.0)
+        self.select = True
+        self.hide = False
+        self.mute = False
+        self.image = None
+        self.operation = "ADD"
+        self.mode = "RGB"
+        self.interpolation = "Linear"
+        self.inputs = NodeSockets()
+        self.outputs = NodeSockets()
+        inputs, outputs = node_socket_defs.get(bl_idname, ((), ()))
+        for coll, defs, is_output in ((self.inputs, inputs, False), (self.outputs, outputs, True)) :
+            seen = {}
+            for name, default in defs :
+                identifier = name
+                if name in seen :
+                    seen[name] += 1
+                    identifier = "%s_%03d" % (name, seen[name])
+                else :
+                    seen[name] = 0
+                #end if
+                coll._items.append(NodeSocket(self, name, identifier, is_output, default))
+            #end for
+        #end for
+    #end __init__
+
+    def __setattr__(self, attr, value) :
+        if attr not in ("id_data", "bl_idname", "type", "inputs", "outputs") and hasattr(self, "outputs") :
+            stats.count("Node.%s" % attr)
+        #end if
+        object.__setattr__(self, attr, value)
+    #end __setattr__
+
+    def __repr__(self) :
+        return \
+            "<Node %s %s>" % (self.bl_idname, repr(self.name))
+    #end __repr__
+
+#end Node
+
+class NodeLink :
+
+    def __init__(self, from_socket, to_socket) :
+        self.from_socket = from_socket
+        self.to_socket = to_socket
+        self.from_node = from_socket.node
+        self.to_node = to_socket.node
+        self.is_valid = True
+    #end __init__
+
+#end NodeLink
+
+class Nodes(bpy_prop_collection) :
+
+    def __init__(self, tree) :
+        super().__init__()
+        self._tree = tree
+    #end __init__
+
+    def new(self, type) :
+        stats.count("nodes.new")
+        if type not in node_socket_defs :
+            raise RuntimeError("Error: Node type %s undefined" % type)
+        #end if
+        node = Node(self._tree, type)
+        names = set(n.name for n in self._items)
+        name = node.name
+        seq = 0
+        while name in names :
+            seq += 1
+            name = "%s.%03d" % (node.name, seq)
+        #end while
+        object.__setattr__(node, "name", name)
+        self._items.append(node)
+        return \
+            node
+    #end new
+
+    def remove(self, node) :
+        stats.count("nodes.remove")
+        self._tree.links._items = list \
+          (
+            l for l in self._tree.links._items
+            if l.from_node is not node and l.to_node is not node
+          )
+        self._items.remove(node)
+    #end remove
+
+    def clear(self) :
+        stats.count("nodes.clear")
+        self._tree.links._items = []
+        self._items = []
+    #end clear
+
+    @property
+    def active(self) :
+        return \
+            None
+    #end active
+
+#end Nodes
+
+class Links(bpy_prop_collection) :
+
+    def new(self, a, b, verify_limits = True) :
+        stats.count("links.new")
+        if a.is_output :
+            from_socket, to_socket = a, b
+        else :
+            from_socket, to_socket = b, a
+        #end if
+        if verify_limits :
+            # an input can only have one link
+            self._items = list(l for l in self._items if l.to_socket is not to_socket)
+        #end if
+        link = NodeLink(from_socket, to_socket)
+        self._items.append(link)
+        return \
+            link
+    #end new
+
+    def remove(self, link) :
+        stats.count("links.remove")
+        self._items.remove(link)
+    #end remove
+
+#end Links
+
+class NodeTree(ID) :
+
+    def __init__(self, name, type = "ShaderNodeTree") :
+        ID.__init__(self, name)
+        self.bl_idname = type
+        self.nodes = Nodes(self)
+        self.links = Links()
+    #end __init__
+
+    def copy_into(self, other) :
+        # deep-copies nodes and links into other, which is assumed empty.
+        mapping = {}
+        for node in self.nodes._items :
+            new = Node(other, node.bl_idname)
+            for attr, value in node.__dict__.items() :
+                if attr not in ("id_data", "inputs", "outputs") :
+                    object.__setattr__(new, attr, value)
+                #end if
+            #end for
+            for old_sockets, new_sockets in ((node.inputs, new.inputs), (node.outputs, new.outputs)) :
+                for old_socket, new_socket in zip(old_sockets, new_sockets) :
+                    new_socket._default_value = old_socket._default_value
+                    mapping[id(old_socket)] = new_socket
+                #end for
+            #end for
+            other.nodes._items.append(new)
+        #end for
+        for link in self.links._items :
+            other.links._items.append \
+              (
+                NodeLink(mapping[id(link.from_socket)], mapping[id(link.to_socket)])
+              )
+        #end for
+    #end copy_into
+
+#end NodeTree
+
+class MaterialCycles :
+
+    def __init__(self) :
+        self.displacement_method = "BUMP"
+    #end __init__
+
+#end MaterialCycles
+
+class Material(_Named, ID) :
+
+    def __init__(self, name) :
+        ID.__init__(self, name)
+        self.node_tree = None
+        self._use_nodes = False
+        self.diffuse_color = (0.8, 0.8, 0.8, 1.0)
+        self.blend_method = "OPAQUE"
+        self.surface_render_method = "DITHERED"
+        self.cycles = MaterialCycles()
+    #end __init__
+
+    @property
+    def use_nodes(self) :
+        return \
+            self._use_nodes
+    #end use_nodes
+
+    @use_nodes.setter
+    def use_nodes(self, value) :
+        stats.count("Material.use_nodes")
+        if value and self.node_tree == None :
+            self.node_tree = NodeTree("Shader Nodetree")
+            output = self.node_tree.nodes.new("ShaderNodeOutputMaterial")
+            output.name = "Material Output"
+            shader = self.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
+            shader.name = "Principled BSDF"
+            self.node_tree.links.new(shader.outputs[0], output.inputs[0])
+        #end if
+        self._use_nodes = value
+    #end use_nodes
+
+    def _count_users(self) :
+        from . import data
+        return \
+            sum \
+              (
+                1
+                for obj in data.objects
+                for slot in obj.material_slots
+                if slot.material is self
+              )
+    #end _count_users
+
+    def copy(self) :
+        stats.count("Material.copy")
+        result = Material(self.name)
+        for attr in ("diffuse_color", "blend_method", "surface_render_method", "_use_nodes") :
+            object.__setattr__(result, attr, getattr(self, attr))
+        #end for
+        result.cycles.displacement_method = self.cycles.displacement_method
+        result._idprops().update(self._idprops())
+        if self.node_tree != None :
+            result.node_tree = NodeTree(self.node_tree.name)
+            self.node_tree.copy_into(result.node_tree)
+        #end if
+        return \
+            self._collection._add(result)
+    #end copy
+
+#end Material
+
+class MaterialSlot :
+
+    def __init__(self) :
+        self.material = None
+        self.link = "OBJECT"
+    #end __init__
+
+    @property
+    def name(self) :
+        if self.material != None :
+            result = self.material.name
+        else :
+            result = ""
+        #end if
+        return \
+            result
+    #end name
+
+#end MaterialSlot
+
+class Object(_Named, ID) :
+
+    def __init__(self, name, object_data = None) :
+        ID.__init__(self, name)
+        self.data = object_data
+        self.type = ("EMPTY", "MESH")[object_data != None]
+        self._material_slots = bpy_prop_collection(MaterialSlot)
+        self.active_material_index = 0
+        self.select = False
+    #end __init__
+
+    @property
+    def material_slots(self) :
+        # as in Blender, there is a slot for each material appended to the
+        # mesh, as well as any added to the object directly.
+        if isinstance(self.data, Mesh) :
+            while len(self._material_slots) < len(self.data.materials) :
+                slot = self._material_slots.add()
+                slot.material = self.data.materials[len(self._material_slots) - 1]
+            #end while
+        #end if
+        return \
+            self._material_slots
+    #end material_slots
+
+    @property
+    def active_material(self) :
+        if len(self.material_slots) != 0 :
+            result = self.material_slots[self.active_material_index].material
+        else :
+            result = None
+        #end if
+        return \
+            result
+    #end active_material
+
+    @active_material.setter
+    def active_material(self, material) :
+        if len(self.material_slots) == 0 :
+            self.material_slots.add()
+        #end if
+        self.material_slots[self.active_material_index].material = material
+    #end active_material
+
+    def select_get(self) :
+        return \
+            self.select
+    #end select_get
+
+    def select_set(self, state) :
+        self.select = state
+    #end select_set
+
+#end Object
+
+class Mesh(_Named, ID) :
+
+    def __init__(self, name) :
+        ID.__init__(self, name)
+        self.materials = _MeshMaterials()
+    #end __init__
+
+#end Mesh
+
+class _MeshMaterials(list) :
+
+    def append(self, material) :
+        stats.count("Mesh.materials.append")
+        super().append(material)
+    #end append
+
+#end _MeshMaterials
+
+class Library(_Named, ID) :
+
+    def __init__(self, name, filepath = "") :
+        ID.__init__(self, name)
+        self.filepath = filepath
+    #end __init__
+
+#end Library
+
+#+
+# UI and operator classes
+#-
+
+class bpy_struct :
+
+    def __init__(self) :
+        props.init_properties(self)
+    #end __init__
+
+#end bpy_struct
+
+class Operator(bpy_struct) :
+
+    bl_idname = ""
+    bl_label = ""
+
+    def __init__(self) :
+        super().__init__()
+        self.reports = []
+        self.layout = None
+    #end __init__
+
+    def report(self, type, message) :
+        self.reports.append((set(type), message))
+    #end report
+
+#end Operator
+
+class Panel(bpy_struct) :
+    pass
+#end Panel
+
+class UIList(bpy_struct) :
+    pass
+#end UIList
+
+class Menu(bpy_struct) :
+    pass
+#end Menu
+
+class PropertyGroup(bpy_struct) :
+    pass
+#end PropertyGroup
+
+class AddonPreferences(bpy_struct) :
+    pass
+#end AddonPreferences
+
+class OperatorFileListElement(PropertyGroup) :
+    name : props.StringProperty()
+#end OperatorFileListElement
+
+class _MenuType :
+
+    def __init__(self) :
+        self.draw_funcs = []
+    #end __init__
+
+    def append(self, func) :
+        self.draw_funcs.append(func)
+    #end append
+
+    def prepend(self, func) :
+        self.draw_funcs.insert(0, func)
+    #end prepend
+
+    def remove(self, func) :
+        self.draw_funcs.remove(func)
+    #end remove
+
+#end _MenuType
+
+TOPBAR_MT_file_import = _MenuType()
+MATERIAL_MT_context_menu = _MenuType()
+
+class WindowManager(bpy_struct) :
+
+    def __init__(self) :
+        super().__init__()
+        self.progress = None
+        self.timers = []
+        self.modal_handlers = []
+    #end __init__
+
+    def progress_begin(self, min, max) :
+        self.progress = min
+    #end progress_begin
+
+    def progress_update(self, value) :
+        self.progress = value
+    #end progress_update
+
+    def progress_end(self) :
+        self.progress = None
+    #end progress_end
+
+    def event_timer_add(self, time_step, window = None) :
+        timer = _Timer(time_step)
+        self.timers.append(timer)
+        return \
+            timer
+    #end event_timer_add
+
+    def event_timer_remove(self, timer) :
+        self.timers.remove(timer)
+    #end event_timer_remove
+
+    def fileselect_add(self, operator) :
+        self.modal_handlers.append(operator)
+    #end fileselect_add
+
+    def modal_handler_add(self, operator) :
+        self.modal_handlers.append(operator)
+        return \
+            True
+    #end modal_handler_add
+
+#end WindowManager
+
+class _Timer :
+
+    def __init__(self, time_step) :
+        self.time_step = time_step
+    #end __init__
+
+#end _Timer
+
+class Scene(ID) :
+    pass
+#end Scene
@@ -0,0 +1,38 @@
+#+
+# Fake bpy.utils: class registration keeps a list of the registered
+# classes, and makes registered operators callable through bpy.ops.
+#-
+
+from . import \
+    types, \
+    ops
+
+registered_classes = []
+
+def register_class(ċlass) :
+    if ċlass in registered_classes :
+        raise ValueError("register_class(...): already registered as a subclass %s" % repr(ċlass.__name__))
+    #end if
+    registered_classes.append(ċlass)
+    if issubclass(ċlass, types.Operator) :
+        ops.operators[ċlass.bl_idname] = ċlass
+    #end if
+#end register_class
+
+def unregister_class(ċlass) :
+    registered_classes.remove(ċlass)
+    if ops.operators.get(getattr(ċlass, "bl_idname", None)) is ċlass :
+        del ops.operators[ċlass.bl_idname]
+    #end if
+#end unregister_class
+
+def user_resource(resource_type, path = "", create = False) :
+    import os
+    import tempfile
+    result = os.path.join(tempfile.gettempdir(), "fakebpy", resource_type.lower(), path)
+    if create :
+        os.makedirs(result, exist_ok = True)
+    #end if
+    return \
+        result
+#end user_resource
@@ -0,0 +1,3 @@
+#+
+# Fake bpy_extras package, see the bpy package alongside.
+#-
@@ -0,0 +1,21 @@
+#+
+# Fake bpy_extras.io_utils.
+#-
+
+import bpy
+
+class ImportHelper :
+
+    filepath : bpy.props.StringProperty(subtype = "FILE_PATH")
+
+    def invoke(self, context, event) :
+        context.window_manager.fileselect_add(self)
+        return \
+            {"RUNNING_MODAL"}
+    #end invoke
+
+#end ImportHelper
+
+class ExportHelper(ImportHelper) :
+    pass
+#end ExportHelper
@@ -0,0 +1,238 @@
+#!/usr/bin/python3
+#+
+# Golden snapshots of material node graphs built with the fake bpy
+# package alongside, for checking that changes to the node builder or
+# image loading do not change what gets built, and measuring how much
+# work it takes. Invoke as
+#
+#     python3 fakebpy/snapshot.py [--update] [--storage=«mode»] «golden_dir» «file.mhmat»...
+#
+# Each .mhmat file is imported into an empty fake .blend file through
+# the material.import_mhmat operator, and a snapshot taken of the
+# resulting material: its settings, nodes (with unlinked input values
+# and images) and links. This is compared with the snapshot of the same
+# name in «golden_dir»; with --update, the golden snapshot is written
+# instead. For each file, the number of RNA-equivalent calls and the
+# bytes allocated for images are reported. The exit status is 0 if
+# every snapshot matched, 3 otherwise.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import json
+import getopt
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import bpy
+
+volatile_props = {"mhmat_fingerprint", "mhmat_mtimes", "mhmat_source"}
+  # custom properties that depend on where and when a file was imported,
+  # or change with fingerprint_version, rather than on what was built
+
+def _value(value) :
+    # converts a property value to a JSON-compatible form that compares
+    # reliably.
+    if isinstance(value, float) :
+        value = round(value, 6)
+    elif isinstance(value, (tuple, list)) :
+        value = list(_value(v) for v in value)
+    #end if
+    return \
+        value
+#end _value
+
+def image_snapshot(image) :
+    if image != None :
+        result = \
+            {
+                "name" : image.name,
+                "size" : list(image.size),
+                "colorspace" : image.colorspace_settings.name,
+                "alpha_mode" : image.alpha_mode,
+                "packed" : image.packed_file != None,
+            }
+    else :
+        result = None
+    #end if
+    return \
+        result
+#end image_snapshot
+
+def material_snapshot(material) :
+    # returns a JSON-compatible dict describing the material and its
+    # node graph, independent of the order in which nodes and links
+    # were created.
+    nodes = {}
+    links = []
+    if material.node_tree != None :
+        for node in material.node_tree.nodes :
+            nodes[node.name] = \
+                {
+                    "type" : node.bl_idname,
+                    "label" : node.label,
+                    "location" : _value(node.location),
+                    "image" : image_snapshot(node.image),
+                    "inputs" :
+                        dict
+                          (
+                            (socket.identifier, _value(socket.default_value))
+                            for socket in node.inputs
+                            if not socket.is_linked
+                          ),
+                }
+            if node.bl_idname == "ShaderNodeMath" :
+                nodes[node.name]["operation"] = node.operation
+            #end if
+        #end for
+        links = sorted \
+          (
+                "%s:%s -> %s:%s"
+            %
+                (
+                    link.from_node.name, link.from_socket.identifier,
+                    link.to_node.name, link.to_socket.identifier,
+                )
+            for link in material.node_tree.links
+          )
+    #end if
+    return \
+        {
+            "diffuse_color" : _value(material.diffuse_color),
+            "blend_method" : material.blend_method,
+            "surface_render_method" : material.surface_render_method,
+            "displacement_method" : material.cycles.displacement_method,
+            "props" :
+                dict
+                  (
+                    (key, _value(material[key]))
+                    for key in sorted(material.keys())
+                    if key not in volatile_props
+                  ),
+            "nodes" : dict(sorted(nodes.items())),
+            "links" : links,
+        }
+#end material_snapshot
+
+def compare(expected, actual, where = "") :
+    # returns a list of messages describing the differences between two
+    # snapshots, empty if they are the same.
+    differences = []
+    if isinstance(expected, dict) and isinstance(actual, dict) :
+        for key in sorted(set(expected) | set(actual)) :
+            item = "%s.%s" % (where, key)
+            if key not in actual :
+                differences.append("%s: missing" % item)
+            elif key not in expected :
+                differences.append("%s: unexpected %s" % (item, json.dumps(actual[key])))
+            else :
+                differences.extend(compare(expected[key], actual[key], item))
+            #end if
+        #end for
+    elif isinstance(expected, list) and isinstance(actual, list) and where.endswith(".links") :
+        for link in expected :
+            if link not in actual :
+                differences.append("%s: missing %s" % (where, link))
+            #end if
+        #end for
+        for link in actual :
+            if link not in expected :
+                differences.append("%s: unexpected %s" % (where, link))
+            #end if
+        #end for
+    elif expected != actual :
+        differences.append \
+          (
+            "%s: expected %s, got %s" % (where, json.dumps(expected), json.dumps(actual))
+          )
+    #end if
+    return \
+        differences
+#end compare
+
+def import_snapshot(filepath, storage = "LINK") :
+    # imports the specified .mhmat file into an empty fake .blend file
+    # and returns a 2-tuple (snapshot, stats), where stats is as returned
+    # from bpy.types.stats.as_dict() for the import.
+    import import_mhmat_material
+    bpy.reset()
+    import_mhmat_material.register()
+    try :
+        bpy.ops.material.import_mhmat(filepath = filepath, texture_storage = storage)
+        stats = bpy.types.stats.as_dict()
+        materials = list \
+          (
+            m for m in bpy.data.materials
+            if import_mhmat_material.nodes.SHAPE_PROP in m
+          )
+    finally :
+        import_mhmat_material.unregister()
+    #end try
+    return \
+        material_snapshot(materials[0]), stats
+#end import_snapshot
+
+#+
+# Mainline
+#-
+
+if __name__ == "__main__" :
+    opts, args = getopt.getopt(sys.argv[1:], "", ["storage=", "update"])
+    if len(args) < 2 :
+        raise getopt.GetoptError("usage: %s [--update] «golden_dir» «file.mhmat»..." % sys.argv[0])
+    #end if
+    update = False
+    storage = "LINK"
+    for keyword, value in opts :
+        if keyword == "--update" :
+            update = True
+        elif keyword == "--storage" :
+            storage = value
+        #end if
+    #end for
+    golden_dir = args[0]
+    status = 0
+    for filepath in args[1:] :
+        snapshot, stats = import_snapshot(os.path.abspath(filepath), storage)
+        golden = os.path.join \
+          (
+            golden_dir,
+            os.path.splitext(os.path.basename(filepath))[0] + ".json"
+          )
+        if update :
+            os.makedirs(golden_dir, exist_ok = True)
+            with open(golden, "wt") as outfile :
+                json.dump(snapshot, outfile, indent = 4)
+                outfile.write("\n")
+            #end with
+            outcome = "updated"
+        else :
+            try :
+                with open(golden, "rt") as infile :
+                    differences = compare(json.load(infile), snapshot)
+                #end with
+            except FileNotFoundError :
+                differences = ["no golden snapshot %s" % golden]
+            #end try
+            if len(differences) != 0 :
+                outcome = "DIFFERS"
+                status = 3
+            else :
+                outcome = "ok"
+            #end if
+            for line in differences :
+                sys.stderr.write("%s: %s\n" % (filepath, line))
+            #end for
+        #end if
+        sys.stdout.write \
+          (
+                "%s: %s, %d calls, %d bytes allocated\n"
+            %
+                (filepath, outcome, stats["total_calls"], stats["allocated_bytes"])
+          )
+    #end for
+    sys.exit(status)
+#end if
@@ -0,0 +1,1454 @@
+#+
+# This Blender addon imports a .mhmat material definition from
+# MakeHuman into the current .blend file.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import time
+import tempfile
+import collections
+import concurrent.futures
+import bpy
+import bpy.props
+import bpy_extras.io_utils
+from . import \
+    mhmat, \
+    textures, \
+    imagecache, \
+    matcache, \
+    nodes, \
+    proxies, \
+    channelpack, \
+    bundle, \
+    libindex, \
+    texlib, \
+    profiling
+
+bl_info = \
+    {
+        "name" : "Import MakeHuman Material",
+        "author" : "Lawrence D'Oliveiro <ldo@geek-central.gen.nz>",
+        "version" : (0, 3, 0),
+        "blender" : (4, 1, 0),
+        "location" : "File > Import",
+        "description" : "imports a material definition from a .mhmat file.",
+        "warning" : "",
+        "wiki_url" : "",
+        "tracker_url" : "",
+        "category" : "Import-Export",
+    }
+
+#+
+# Useful stuff
+#-
+
+Failure = mhmat.Failure
+
+def texture_library_dir() :
+    # the shared texture library configured in the addon preferences, or
+    # the default one.
+    addon = bpy.context.preferences.addons.get(__package__)
+    library_dir = ""
+    if addon != None :
+        library_dir = bpy.path.abspath(addon.preferences.texture_library)
+    #end if
+    return \
+        library_dir or texlib.default_library_dir()
+#end texture_library_dir
+
+#+
+# Do the work
+#-
+
+def load_material_images(settings, loader, channel_pack = False) :
+    # loads all the textures referenced by settings using the specified
+    # imagecache.ImageLoader, returning a dict mapping texture keyword
+    # to image. If channel_pack, the grayscale maps all map to the same
+    # channel-packed image, if there are enough of them.
+    images = {}
+    if channel_pack :
+        packed = channelpack.load_packed(settings, loader)
+    else :
+        packed = None
+    #end if
+    for keyword in mhmat.texture_keywords :
+        pathname = settings.texture_pathname(keyword)
+        if pathname != None :
+            if packed != None and keyword in channelpack.packed_keywords :
+                images[keyword] = packed
+            else :
+                images[keyword] = loader.load \
+                  (
+                    pathname,
+                    mhmat.valid_keywords[keyword]["is_colour"]
+                  )
+            #end if
+        #end if
+    #end for
+    return \
+        images
+#end load_material_images
+
+def material_fingerprint(settings, loader, channel_pack) :
+    # returns the fingerprint for a material built from settings with the
+    # images from the specified loader.
+    profile = loader.profile
+    with profile.phase("hash") :
+        texture_hashes = dict \
+          (
+            (keyword, textures.content_hash(settings.texture_pathname(keyword)))
+            for keyword in mhmat.texture_keywords
+            if getattr(settings, keyword) != None
+          )
+    #end with
+    proxy_sizes = tuple \
+      (
+        (keyword, loader.proxy_size)
+        for keyword in sorted(texture_hashes)
+        if settings.texture_pathname(keyword) in loader.proxies
+      )
+    return \
+        mhmat.fingerprint \
+          (
+            settings,
+            texture_hashes,
+            proxy_sizes + ((("channel_pack", True),) if channel_pack else ())
+          )
+#end material_fingerprint
+
+def import_material(settings, loader, reuse = True, channel_pack = False) :
+    # returns a 2-tuple (material, reused) giving the material for the
+    # parsed settings, and whether it is an existing material with the same
+    # fingerprint rather than a newly-built one.
+    channel_pack = channel_pack and channelpack.would_pack(settings)
+    profile = loader.profile
+    fingerprint = material_fingerprint(settings, loader, channel_pack)
+    if reuse :
+        material = matcache.find_material(fingerprint)
+    else :
+        material = None
+    #end if
+    reused = material != None
+    if not reused :
+        material = nodes.make_material \
+          (
+            settings,
+            load_material_images(settings, loader, channel_pack),
+            profile = profile
+          )
+        matcache.add_material(material, fingerprint)
+        matcache.record_source(material, settings)
+        profile.count("materials_created")
+    else :
+        profile.count("materials_reused")
+    #end if
+    return \
+        material, reused
+#end import_material
+
+def reload_material(material, loader) :
+    # brings a material imported from a .mhmat file up to date with any
+    # changes to that file or its textures, keeping the same proxy
+    # resolution and channel-packing as before. Only the values and images
+    # that have changed are updated, unless the changes need a different
+    # graph shape, in which case the node tree is rebuilt in place. Either
+    # way, the material itself stays the same datablock, so objects using
+    # it are unaffected. Returns a 2-tuple (changed, rebuilt). Raises
+    # Failure if the file can no longer be imported.
+    settings, errors = mhmat.load_and_validate(material[matcache.SOURCE_PROP])
+    if len(errors) != 0 :
+        raise Failure("; ".join(errors))
+    #end if
+    report_warnings(settings)
+    material_nodes = material.node_tree.nodes if material.node_tree != None else ()
+    channel_pack = nodes.PACKED_IMAGE_NODE in material_nodes
+    proxy_size = max \
+      (
+        (
+            node.image.get(imagecache.PROXY_PROP, 0)
+            for node in material_nodes
+            if node.bl_idname == "ShaderNodeTexImage" and node.image != None
+        ),
+        default = 0
+      )
+    if proxy_size != 0 :
+        loader = imagecache.ImageLoader \
+          (
+            storage = loader.storage,
+            scrub_paths = loader.scrub_paths,
+            profile = loader.profile,
+            proxies = proxies.generate
+              (
+                list
+                  (
+                    settings.texture_pathname(keyword)
+                    for linenr, keyword, texname in settings.textures
+                  ),
+                proxy_size,
+                bpy.app.binary_path
+              ),
+            proxy_size = proxy_size,
+            library_dir = loader.library_dir
+          )
+    #end if
+    fingerprint = material_fingerprint(settings, loader, channel_pack)
+    changed = fingerprint != material.get(matcache.FINGERPRINT_PROP)
+    rebuilt = False
+    if changed :
+        images = load_material_images(settings, loader, channel_pack)
+        shape = nodes.graph_shape(settings, images)
+        rebuilt = material.get(nodes.SHAPE_PROP) != nodes.shape_key(shape)
+        if rebuilt :
+            nodes.build_graph(material, shape)
+            material[nodes.SHAPE_PROP] = nodes.shape_key(shape)
+        #end if
+        nodes.patch_material(material, settings, images, shape, only_changed = not rebuilt)
+        matcache.add_material(material, fingerprint)
+    #end if
+    if proxy_size != 0 :
+        loader.finish()
+    #end if
+    matcache.record_source(material, settings)
+    return \
+        changed, rebuilt
+#end reload_material
+
+def reload_materials(storage = "PACK", scrub_paths = True, retry_failed = True) :
+    # reloads all imported materials in the current .blend file that are
+    # out of date, with newly-loaded images stored as specified. Unless
+    # retry_failed, materials whose files have not changed since their
+    # last reload failed are left alone. Returns a 3-tuple (nr_reloaded,
+    # nr_rebuilt, errors).
+    nr_reloaded = 0
+    nr_rebuilt = 0
+    errors = []
+    loader = None
+    for material in list(bpy.data.materials) :
+        if material.library == None and matcache.is_stale(material, retry_failed) :
+            if loader == None :
+                imagecache.rebuild_index()
+                matcache.rebuild_index()
+                loader = imagecache.ImageLoader \
+                  (
+                    storage = storage,
+                    scrub_paths = scrub_paths,
+                    library_dir = texture_library_dir()
+                  )
+            #end if
+            try :
+                changed, rebuilt = reload_material(material, loader)
+                nr_reloaded += int(changed)
+                nr_rebuilt += int(rebuilt)
+            except Failure as why :
+                errors.append(why.msg)
+                matcache.record_failure(material)
+            except (RuntimeError, OSError) as why :
+                errors.append("import_mhmat error: material %s: %s" % (repr(material.name), why))
+                matcache.record_failure(material)
+            #end try
+        #end if
+    #end for
+    if loader != None :
+        loader.finish()
+    #end if
+    return \
+        nr_reloaded, nr_rebuilt, errors
+#end reload_materials
+
+#+
+# Watching for changes
+#-
+
+watch_interval = 2.0 # seconds
+_watch_options = None # args to reload_materials, None if not watching
+
+def _watch() :
+    # timer function for automatically reloading changed materials.
+    if _watch_options != None :
+        nr_reloaded, nr_rebuilt, errors = reload_materials(retry_failed = False, **_watch_options)
+          # only report each failure once, until the files change again
+        for msg in errors :
+            sys.stderr.write(msg + "\n")
+        #end for
+        if nr_reloaded != 0 :
+            sys.stderr.write("import_mhmat: reloaded %d changed materials\n" % nr_reloaded)
+        #end if
+        interval = watch_interval
+    else :
+        interval = None # stop
+    #end if
+    return \
+        interval
+#end _watch
+
+def set_watching(options) :
+    # starts watching for changes to imported materials, reloading them
+    # with the specified dict of reload_materials arguments, or stops if
+    # options is None.
+    global _watch_options
+    _watch_options = options
+    if options != None :
+        if not bpy.app.timers.is_registered(_watch) :
+            bpy.app.timers.register(_watch, first_interval = watch_interval)
+        #end if
+    else :
+        if bpy.app.timers.is_registered(_watch) :
+            bpy.app.timers.unregister(_watch)
+        #end if
+    #end if
+#end set_watching
+
+def assign_material(obj, material) :
+    # makes the material the only one used by the object, returning the set
+    # of materials it replaced.
+    replaced = set()
+    if len(obj.material_slots) == 0 :
+        obj.data.materials.append(material)
+    else :
+        for slot in obj.material_slots :
+            if slot.material != None and slot.material != material :
+                replaced.add(slot.material)
+            #end if
+            slot.material = material
+        #end for
+    #end if
+    return \
+        replaced
+#end assign_material
+
+def prepare_file(filepath) :
+    # parses and validates a .mhmat file and hashes its textures, ready for
+    # import_material. This only reads files, so it can be done on a
+    # worker thread. Returns a 2-tuple (settings, errors) as for
+    # mhmat.load_and_validate.
+    settings, errors = mhmat.load_and_validate(filepath)
+    if len(errors) == 0 :
+        for linenr, keyword, texname in settings.textures :
+            try :
+                textures.content_hash(settings.texture_pathname(keyword))
+            except OSError as why :
+                errors.append("import_mhmat error: file %s: %s" % (filepath, why))
+            #end try
+        #end for
+    #end if
+    return \
+        settings, errors
+#end prepare_file
+
+def report_warnings(settings) :
+    for msg in settings.warnings :
+        sys.stderr.write(msg + "\n")
+    #end for
+#end report_warnings
+
+class ImportOptions :
+    # common options for the import operators.
+
+    texture_storage : bpy.props.EnumProperty \
+      (
+        name = "Textures",
+        description = "how to store texture images",
+        items = imagecache.storage_modes,
+        default = "PACK"
+      )
+    scrub_paths : bpy.props.BoolProperty \
+      (
+        name = "Hide Source Paths",
+        description = "replace the original pathnames of packed images with “//textures/«name»”",
+        default = True
+      )
+    proxy_level : bpy.props.EnumProperty \
+      (
+        name = "Texture Resolution",
+        description = "load reduced-resolution proxies of large texture images, generating them if necessary",
+        items = proxies.proxy_levels,
+        default = "FULL"
+      )
+    channel_pack : bpy.props.BoolProperty \
+      (
+        name = "Pack Grayscale Maps",
+        description = "combine the specular, transparency, bump and displacement maps into the channels of a single image",
+        default = False
+      )
+    reuse_materials : bpy.props.BoolProperty \
+      (
+        name = "Reuse Identical Materials",
+        description = "if a material with the same settings and textures has already been imported, use that instead of creating a new one",
+        default = True
+      )
+
+    profile : bpy.props.BoolProperty \
+      (
+        name = "Profile",
+        description = "collect timings and counts for each phase of the import",
+        default = False
+      )
+    profile_file : bpy.props.StringProperty \
+      (
+        name = "Profile File",
+        description = "where to write the profile as JSON, default is in the temporary directory",
+        subtype = "FILE_PATH",
+        default = ""
+      )
+
+    def make_profile(self) :
+        if self.profile :
+            profile = profiling.Profile(label = self.bl_idname)
+        else :
+            profile = profiling.null_profile
+        #end if
+        return \
+            profile
+    #end make_profile
+
+    def proxy_size(self) :
+        # returns the maximum size of texture images, or 0 for full resolution.
+        if self.proxy_level != "FULL" :
+            size = int(self.proxy_level)
+        else :
+            size = 0
+        #end if
+        return \
+            size
+    #end proxy_size
+
+    def generate_proxies(self, texture_pathnames, nr_workers = None) :
+        # generates any needed proxies for the textures that will be loaded,
+        # returning the dict of proxy pathnames for the image loader, or
+        # None if proxies are not wanted.
+        if self.proxy_size() != 0 :
+            result = proxies.generate \
+              (
+                texture_pathnames,
+                self.proxy_size(),
+                bpy.app.binary_path,
+                nr_workers = nr_workers
+              )
+        else :
+            result = None
+        #end if
+        return \
+            result
+    #end generate_proxies
+
+    def make_image_loader(self, profile, proxy_pathnames = None) :
+        return \
+            imagecache.ImageLoader \
+              (
+                storage = self.texture_storage,
+                scrub_paths = self.scrub_paths,
+                profile = profile,
+                proxies = proxy_pathnames,
+                proxy_size = self.proxy_size(),
+                library_dir = texture_library_dir()
+              )
+    #end make_image_loader
+
+    def finish_profile(self, profile) :
+        # saves the profile, if enabled, and reports a summary.
+        if profile.enabled :
+            if self.profile_file != "" :
+                pathname = bpy.path.abspath(self.profile_file)
+            else :
+                pathname = os.path.join(tempfile.gettempdir(), "mhmat_import_profile.json")
+            #end if
+            profile.save(pathname)
+            self.report({"INFO"}, "profile: %s" % profile.summary())
+            sys.stderr.write("import_mhmat profile written to %s\n" % pathname)
+        #end if
+    #end finish_profile
+
+#end ImportOptions
+
+class ImportMakeHumanMaterial(bpy.types.Operator, bpy_extras.io_utils.ImportHelper, ImportOptions) :
+    bl_idname = "material.import_mhmat"
+    bl_label = "Import MakeHuman Material"
+
+    filter_glob : bpy.props.StringProperty \
+      (
+        default = "*.mhmat",
+        options = {"HIDDEN"}
+      )
+
+    def execute(self, context) :
+        imagecache.rebuild_index()
+        matcache.rebuild_index()
+        profile = self.make_profile()
+        try :
+            with profile.phase("parse") :
+                settings, errors = mhmat.load_and_validate(self.filepath)
+            #end with
+            if len(errors) != 0 :
+                raise Failure("; ".join(errors))
+            #end if
+            report_warnings(settings)
+            with profile.phase("proxies") :
+                proxy_pathnames = self.generate_proxies \
+                  (
+                    list
+                      (
+                        settings.texture_pathname(keyword)
+                        for linenr, keyword, texname in settings.textures
+                      )
+                  )
+            #end with
+            loader = self.make_image_loader(profile, proxy_pathnames)
+            material, reused = import_material(settings, loader, self.reuse_materials, self.channel_pack)
+            loader.finish()
+            self.finish_profile(profile)
+            if reused :
+                self.report({"INFO"}, "reusing identical existing material %s" % repr(material.name))
+            #end if
+            # all done
+            status = {"FINISHED"}
+        except Failure as why :
+            sys.stderr.write("Failure: %s\n" % why.msg) # debug
+            self.report({"ERROR"}, why.msg)
+            status = {"CANCELLED"}
+        #end try
+        return \
+            status
+    #end execute
+
+#end ImportMakeHumanMaterial
+
+class BatchImport(ImportOptions) :
+    # options and logic for the operators that import a list of .mhmat
+    # files, which they supply by defining get_filepaths. This is kept
+    # separate from any operator class, because Blender only collects
+    # properties from mixin classes, not from another operator.
+
+    nr_workers : bpy.props.IntProperty \
+      (
+        name = "Parser Threads",
+        description = "number of threads for parsing and validating files, 0 for automatic",
+        min = 0,
+        default = 0
+      )
+
+    background : bpy.props.BoolProperty \
+      (
+        name = "Import in Background",
+        description = "keep Blender responsive during the import, showing progress in the status bar; press Esc to stop",
+        default = True
+      )
+
+    def import_result(self, filepath, settings, errors, loader) :
+        # imports one material from the result of parsing and validating
+        # filepath, if it is good, and counts the outcome.
+        if len(errors) == 0 :
+            report_warnings(settings)
+            try :
+                material, reused = import_material(settings, loader, self.reuse_materials, self.channel_pack)
+                self.nr_imported += 1
+                self.nr_reused += int(reused)
+            except RuntimeError as why :
+                # e.g. image that exists but cannot be loaded
+                errors.append("import_mhmat error: file %s: %s" % (filepath, why))
+            #end try
+        #end if
+        if len(errors) != 0 :
+            self.nr_failed += 1
+            for msg in errors :
+                sys.stderr.write(msg + "\n")
+            #end for
+        #end if
+    #end import_result
+
+    def report_summary(self, nr_files, cancelled = False) :
+        summary = "imported %d of %d MakeHuman materials" % (self.nr_imported, nr_files)
+        if self.nr_reused != 0 :
+            summary += " (%d identical to existing materials)" % self.nr_reused
+        #end if
+        if cancelled :
+            self.report({"WARNING"}, "%s, cancelled" % summary)
+        elif self.nr_failed != 0 :
+            self.report \
+              (
+                {"WARNING"},
+                "%s, %d failed (see system console for details)" % (summary, self.nr_failed)
+              )
+        else :
+            self.report({"INFO"}, summary)
+        #end if
+    #end report_summary
+
+    def execute(self, context) :
+        filepaths = self.get_filepaths(context)
+        self.nr_imported = 0
+        self.nr_reused = 0
+        self.nr_failed = 0
+        profile = self.make_profile()
+        if self.background and not bpy.app.background :
+            return \
+                self.start_modal(context, filepaths, profile)
+        #end if
+        with profile.phase("parse") :
+            results = mhmat.load_all(filepaths, self.nr_workers or None)
+        #end with
+        texture_pathnames = list \
+          (
+            settings.texture_pathname(keyword)
+            for filepath, settings, errors in results
+            if len(errors) == 0
+            for linenr, keyword, texname in settings.textures
+          )
+        with profile.phase("hash") :
+            textures.hash_all(texture_pathnames, self.nr_workers or None)
+              # warm the hash cache in parallel
+        #end with
+        imagecache.rebuild_index()
+        matcache.rebuild_index()
+        try :
+            with profile.phase("proxies") :
+                proxy_pathnames = self.generate_proxies(texture_pathnames, self.nr_workers or None)
+            #end with
+        except Failure as why :
+            self.report({"ERROR"}, why.msg)
+            return \
+                {"CANCELLED"}
+        #end try
+        loader = self.make_image_loader(profile, proxy_pathnames)
+        for filepath, settings, errors in results :
+          # creating datablocks has to be done on the main thread
+            self.import_result(filepath, settings, errors, loader)
+        #end for
+        loader.finish()
+        profile.count("files", len(results))
+        profile.count("files_failed", self.nr_failed)
+        self.report_summary(len(results))
+        self.finish_profile(profile)
+        return \
+            {"FINISHED"}
+    #end execute
+
+    #+
+    # Background import
+    #
+    # Files are parsed and validated, and their textures hashed, by a
+    # pool of worker threads. Hashing reads every texture file in full,
+    # which also brings it into the OS file cache, so that loading it on
+    # the main thread is quick, even from a slow network share. A timer
+    # picks up the results in order and builds the materials, a few at a
+    # time so the UI stays responsive. Each material is built entirely
+    # within one timer event, so cancelling never leaves one half-built.
+    #-
+
+    step_time = 0.1
+      # maximum seconds to spend building materials per timer event
+
+    def start_modal(self, context, filepaths, profile) :
+        self.filepaths = filepaths
+        self.import_profile = profile
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers = self.nr_workers or None)
+        self.pending = collections.deque \
+          (
+            (filepath, self.pool.submit(prepare_file, filepath))
+            for filepath in filepaths
+          )
+        self.loader = None
+        self.proxies_future = None
+        imagecache.rebuild_index()
+        matcache.rebuild_index()
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, max(len(filepaths), 1))
+        self.timer = window_manager.event_timer_add(0.05, window = context.window)
+        window_manager.modal_handler_add(self)
+        self.show_progress(context)
+        return \
+            {"RUNNING_MODAL"}
+    #end start_modal
+
+    def show_progress(self, context) :
+        nr_done = len(self.filepaths) - len(self.pending)
+        if self.loader == None and self.proxies_future != None :
+            status = "generating texture proxies"
+        else :
+            status = "%d of %d" % (nr_done, len(self.filepaths))
+        #end if
+        context.workspace.status_text_set \
+          (
+            "Importing MakeHuman materials: %s (Esc to cancel)" % status
+          )
+        context.window_manager.progress_update(nr_done)
+    #end show_progress
+
+    def step(self) :
+        # does the next bit of the import, returning True when it is all done.
+        if self.loader == None :
+            if self.proxy_size() == 0 :
+                self.loader = self.make_image_loader(self.import_profile)
+            elif self.proxies_future == None :
+                if all(future.done() for filepath, future in self.pending) :
+                    texture_pathnames = []
+                    for filepath, future in self.pending :
+                        settings, errors = future.result()
+                        if len(errors) == 0 :
+                            texture_pathnames.extend \
+                              (
+                                settings.texture_pathname(keyword)
+                                for linenr, keyword, texname in settings.textures
+                              )
+                        #end if
+                    #end for
+                    self.proxies_future = self.pool.submit \
+                      (
+                        proxies.generate,
+                        texture_pathnames,
+                        self.proxy_size(),
+                        bpy.app.binary_path,
+                        nr_workers = self.nr_workers or None
+                      )
+                #end if
+            elif self.proxies_future.done() :
+                self.loader = self.make_image_loader(self.import_profile, self.proxies_future.result())
+                  # raises Failure if proxy generation failed
+            #end if
+        #end if
+        if self.loader != None :
+            deadline = time.perf_counter() + self.step_time
+            while len(self.pending) != 0 and self.pending[0][1].done() :
+                filepath, future = self.pending.popleft()
+                settings, errors = future.result()
+                self.import_result(filepath, settings, errors, self.loader)
+                if time.perf_counter() >= deadline :
+                    break
+            #end while
+        #end if
+        return \
+            self.loader != None and len(self.pending) == 0
+    #end step
+
+    def end_modal(self, context, cancelled) :
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self.timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+        self.pool.shutdown(wait = False, cancel_futures = True)
+          # any files still being worked on are only being read
+        if self.loader != None :
+            self.loader.finish()
+        #end if
+        nr_done = len(self.filepaths) - len(self.pending)
+        self.import_profile.count("files", nr_done)
+        self.import_profile.count("files_failed", self.nr_failed)
+        self.report_summary(len(self.filepaths), cancelled)
+        self.finish_profile(self.import_profile)
+    #end end_modal
+
+    def modal(self, context, event) :
+        if event.type == "ESC" :
+            self.end_modal(context, cancelled = True)
+            status = {"CANCELLED"}
+        elif event.type == "TIMER" and event.timer == self.timer :
+            try :
+                done = self.step()
+            except Failure as why :
+                self.report({"ERROR"}, why.msg)
+                self.end_modal(context, cancelled = True)
+                done = None
+            #end try
+            if done == None :
+                status = {"CANCELLED"}
+            elif done :
+                self.end_modal(context, cancelled = False)
+                status = {"FINISHED"}
+            else :
+                self.show_progress(context)
+                status = {"RUNNING_MODAL"}
+            #end if
+        else :
+            status = {"PASS_THROUGH"}
+        #end if
+        return \
+            status
+    #end modal
+
+#end BatchImport
+
+class ImportMakeHumanMaterials(bpy.types.Operator, bpy_extras.io_utils.ImportHelper, BatchImport) :
+    bl_idname = "material.import_mhmat_batch"
+    bl_label = "Import MakeHuman Materials"
+    bl_description = "imports multiple .mhmat files, or all those in a directory"
+
+    filter_glob : bpy.props.StringProperty \
+      (
+        default = "*.mhmat",
+        options = {"HIDDEN"}
+      )
+    files : bpy.props.CollectionProperty \
+      (
+        type = bpy.types.OperatorFileListElement,
+        options = {"HIDDEN", "SKIP_SAVE"}
+      )
+    directory : bpy.props.StringProperty \
+      (
+        subtype = "DIR_PATH",
+        options = {"HIDDEN", "SKIP_SAVE"}
+      )
+    recursive : bpy.props.BoolProperty \
+      (
+        name = "Include Subdirectories",
+        description = "if no files are selected, import all .mhmat files found in subdirectories as well",
+        default = True
+      )
+
+    def get_filepaths(self, context) :
+        # returns the list of .mhmat files to import.
+        filepaths = list \
+          (
+            os.path.join(self.directory, f.name)
+            for f in self.files
+            if f.name != ""
+          )
+        if len(filepaths) == 0 :
+            # nothing selected, do the whole directory
+            filepaths = mhmat.find_mhmat_files(self.directory, self.recursive)
+        #end if
+        return \
+            filepaths
+    #end get_filepaths
+
+#end ImportMakeHumanMaterials
+
+class ImportMakeHumanBundle(bpy.types.Operator, bpy_extras.io_utils.ImportHelper, ImportOptions) :
+    bl_idname = "import_scene.mhmat_bundle"
+    bl_label = "Import MakeHuman Asset Bundle"
+    bl_description = "imports the meshes in a MakeHuman asset directory along with all their materials"
+
+    filter_glob : bpy.props.StringProperty \
+      (
+        default = "*.mhclo;*.obj;*.mhmat",
+        options = {"HIDDEN"}
+      )
+    directory : bpy.props.StringProperty \
+      (
+        subtype = "DIR_PATH",
+        options = {"HIDDEN", "SKIP_SAVE"}
+      )
+    recursive : bpy.props.BoolProperty \
+      (
+        name = "Include Subdirectories",
+        description = "look for meshes and materials in subdirectories as well",
+        default = True
+      )
+    other_materials : bpy.props.BoolProperty \
+      (
+        name = "Alternative Materials",
+        description = "also import .mhmat files not used by any mesh, such as alternative colours",
+        default = True
+      )
+
+    def execute(self, context) :
+        profile = self.make_profile()
+        with profile.phase("scan") :
+            manifest = bundle.scan_bundle(self.directory, self.recursive)
+        #end with
+        filepaths = list \
+          (
+            filepath
+            for item in manifest.items
+            for filepath in item.materials
+          )
+        if self.other_materials :
+            filepaths.extend(manifest.other_materials)
+        #end if
+        with profile.phase("parse") :
+            results = mhmat.load_all(filepaths, index = manifest.index)
+        #end with
+        texture_pathnames = list \
+          (
+            settings.texture_pathname(keyword)
+            for filepath, settings, errors in results
+            if len(errors) == 0
+            for linenr, keyword, texname in settings.textures
+          )
+        with profile.phase("hash") :
+            textures.hash_all(texture_pathnames)
+        #end with
+        imagecache.rebuild_index()
+        matcache.rebuild_index()
+        try :
+            with profile.phase("proxies") :
+                proxy_pathnames = self.generate_proxies(texture_pathnames)
+            #end with
+        except Failure as why :
+            self.report({"ERROR"}, why.msg)
+            return \
+                {"CANCELLED"}
+        #end try
+        loader = self.make_image_loader(profile, proxy_pathnames)
+          # shared by the whole bundle
+        materials = {}
+        nr_failed = len(manifest.failures)
+        for msg in manifest.failures :
+            sys.stderr.write(msg + "\n")
+        #end for
+        for filepath, settings, errors in results :
+            if len(errors) == 0 :
+                report_warnings(settings)
+                try :
+                    materials[filepath], reused = import_material \
+                      (
+                        settings,
+                        loader,
+                        self.reuse_materials,
+                        self.channel_pack
+                      )
+                except RuntimeError as why :
+                    errors.append("import_mhmat error: file %s: %s" % (filepath, why))
+                #end try
+            #end if
+            if len(errors) != 0 :
+                nr_failed += 1
+                for msg in errors :
+                    sys.stderr.write(msg + "\n")
+                #end for
+            #end if
+        #end for
+        loader.finish()
+        nr_meshes = 0
+        replaced = set()
+        for item in manifest.items :
+            if item.obj != None :
+                for obj in context.selected_objects :
+                    obj.select_set(False)
+                #end for
+                with profile.phase("mesh_import") :
+                    bpy.ops.wm.obj_import(filepath = item.obj)
+                #end with
+                objects = list(context.selected_objects)
+                for obj in objects :
+                    obj.name = item.name
+                #end for
+                nr_meshes += len(objects)
+                material = \
+                    (
+                        list(materials[m] for m in item.materials if m in materials)
+                    +
+                        [None]
+                    )[0]
+                if material != None :
+                    for obj in objects :
+                        if obj.type == "MESH" :
+                            replaced |= assign_material(obj, material)
+                        #end if
+                    #end for
+                #end if
+            else :
+                sys.stderr.write("import_mhmat: mesh for %s not found\n" % item.mhclo)
+                nr_failed += 1
+            #end if
+        #end for
+        for material in replaced :
+            # get rid of materials created by the OBJ importer from .mtl files
+            if material.users == 0 :
+                bpy.data.materials.remove(material)
+            #end if
+        #end for
+        profile.count("meshes", nr_meshes)
+        profile.count("files_failed", nr_failed)
+        summary = \
+            (
+                "imported %d meshes and %d MakeHuman materials from %s"
+            %
+                (nr_meshes, len(materials), os.path.basename(os.path.normpath(self.directory)))
+            )
+        if nr_failed != 0 :
+            self.report \
+              (
+                {"WARNING"},
+                "%s, %d failed (see system console for details)" % (summary, nr_failed)
+              )
+        else :
+            self.report({"INFO"}, summary)
+        #end if
+        self.finish_profile(profile)
+        return \
+            {"FINISHED"}
+    #end execute
+
+#end ImportMakeHumanBundle
+
+class UseFullResolutionTextures(bpy.types.Operator) :
+    bl_idname = "material.mhmat_full_resolution"
+    bl_label = "Use Full-Resolution Textures"
+    bl_description = "replace reduced-resolution proxies in imported MakeHuman materials with the original texture images"
+    bl_options = {"REGISTER", "UNDO"}
+
+    all_materials : bpy.props.BoolProperty \
+      (
+        name = "All Materials",
+        description = "do all materials in the file, not just the active one",
+        default = False
+      )
+    texture_storage : bpy.props.EnumProperty \
+      (
+        name = "Textures",
+        description = "how to store texture images",
+        items = imagecache.storage_modes,
+        default = "PACK"
+      )
+    scrub_paths : bpy.props.BoolProperty \
+      (
+        name = "Hide Source Paths",
+        description = "replace the original pathnames of packed images with “//textures/«name»”",
+        default = True
+      )
+
+    def execute(self, context) :
+        if self.all_materials :
+            materials = list(bpy.data.materials)
+        elif context.material != None :
+            materials = [context.material]
+        else :
+            materials = []
+        #end if
+        imagecache.rebuild_index()
+        loader = imagecache.ImageLoader \
+          (
+            storage = self.texture_storage,
+            scrub_paths = self.scrub_paths,
+            library_dir = texture_library_dir()
+          )
+        cache_dir = proxies.default_cache_dir()
+        nr_replaced = 0
+        not_found = set()
+        for material in materials :
+            changed = False
+            if material.node_tree != None :
+                for node in material.node_tree.nodes :
+                    if (
+                            node.bl_idname == "ShaderNodeTexImage"
+                        and
+                            node.image != None
+                        and
+                            imagecache.PROXY_PROP in node.image
+                    ) :
+                        pathname = proxies.source_pathname(cache_dir, node.image[imagecache.HASH_PROP])
+                        if pathname != None :
+                            node.image = loader.load(pathname, imagecache.image_is_colour(node.image))
+                            nr_replaced += 1
+                            changed = True
+                        else :
+                            not_found.add(node.image.name)
+                        #end if
+                    #end if
+                #end for
+            #end if
+            if changed and matcache.FINGERPRINT_PROP in material :
+                del material[matcache.FINGERPRINT_PROP]
+                  # no longer what importing with the same options would build
+            #end if
+        #end for
+        loader.finish()
+        if len(not_found) != 0 :
+            self.report \
+              (
+                {"WARNING"},
+                    "replaced %d proxies, original images not found for %s"
+                %
+                    (nr_replaced, ", ".join(sorted(not_found)))
+              )
+        else :
+            self.report({"INFO"}, "replaced %d proxies" % nr_replaced)
+        #end if
+        return \
+            {"FINISHED"}
+    #end execute
+
+#end UseFullResolutionTextures
+
+class ReloadMakeHumanMaterials(bpy.types.Operator) :
+    bl_idname = "material.mhmat_reload"
+    bl_label = "Reload MakeHuman Materials"
+    bl_description = "update imported MakeHuman materials whose .mhmat files or textures have changed"
+    bl_options = {"REGISTER", "UNDO"}
+
+    texture_storage : bpy.props.EnumProperty \
+      (
+        name = "Textures",
+        description = "how to store texture images",
+        items = imagecache.storage_modes,
+        default = "PACK"
+      )
+    scrub_paths : bpy.props.BoolProperty \
+      (
+        name = "Hide Source Paths",
+        description = "replace the original pathnames of packed images with “//textures/«name»”",
+        default = True
+      )
+    watch : bpy.props.BoolProperty \
+      (
+        name = "Keep Watching",
+        description = "go on checking for changes every few seconds, and reload materials automatically",
+        default = False
+      )
+
+    def execute(self, context) :
+        options = {"storage" : self.texture_storage, "scrub_paths" : self.scrub_paths}
+        nr_reloaded, nr_rebuilt, errors = reload_materials(**options)
+        for msg in errors :
+            sys.stderr.write(msg + "\n")
+        #end for
+        set_watching((None, options)[self.watch])
+        summary = "reloaded %d MakeHuman materials" % nr_reloaded
+        if nr_rebuilt != 0 :
+            summary += " (%d rebuilt)" % nr_rebuilt
+        #end if
+        if self.watch :
+            summary += ", watching for further changes"
+        #end if
+        if len(errors) != 0 :
+            self.report \
+              (
+                {"WARNING"},
+                "%s, %d failed (see system console for details)" % (summary, len(errors))
+              )
+        else :
+            self.report({"INFO"}, summary)
+        #end if
+        return \
+            {"FINISHED"}
+    #end execute
+
+#end ReloadMakeHumanMaterials
+
+class MoveTexturesToLibrary(bpy.types.Operator) :
+    bl_idname = "material.mhmat_move_to_library"
+    bl_label = "Move Packed Textures to Library"
+    bl_description = "write packed texture images into the shared texture library and link to them from there instead"
+    bl_options = {"REGISTER", "UNDO"}
+
+    all_images : bpy.props.BoolProperty \
+      (
+        name = "All Packed Images",
+        description = "do every packed image, not just those imported from MakeHuman materials",
+        default = False
+      )
+
+    def execute(self, context) :
+        library_dir = texture_library_dir()
+        nr_moved = 0
+        nr_bytes = 0
+        errors = []
+        for image in bpy.data.images :
+            if (
+                    image.packed_file != None
+                and
+                    image.library == None
+                and
+                    (self.all_images or imagecache.HASH_PROP in image)
+            ) :
+                ext = os.path.splitext(bpy.path.basename(image.filepath))[1]
+                if ext == "" :
+                    ext = "." + image.file_format.lower()
+                #end if
+                try :
+                    pathname = texlib.add_data(library_dir, image.packed_file.data, ext)
+                except OSError as why :
+                    errors.append("import_mhmat error: image %s: %s" % (repr(image.name), why))
+                    continue
+                #end try
+                nr_bytes += image.packed_file.size
+                image.filepath = pathname
+                image.unpack(method = "REMOVE")
+                image.reload()
+                nr_moved += 1
+            #end if
+        #end for
+        for msg in errors :
+            sys.stderr.write(msg + "\n")
+        #end for
+        summary = \
+            (
+                "moved %d images (%.1fMiB) to texture library %s"
+            %
+                (nr_moved, nr_bytes / 1048576, library_dir)
+            )
+        if len(errors) != 0 :
+            self.report \
+              (
+                {"WARNING"},
+                "%s, %d failed (see system console for details)" % (summary, len(errors))
+              )
+        else :
+            self.report({"INFO"}, summary)
+        #end if
+        return \
+            {"FINISHED"}
+    #end execute
+
+#end MoveTexturesToLibrary
+
+class ImportMakeHumanPreferences(bpy.types.AddonPreferences) :
+    bl_idname = __package__
+
+    texture_library : bpy.props.StringProperty \
+      (
+        name = "Texture Library",
+        description = "directory for the shared texture library, leave blank for the default",
+        subtype = "DIR_PATH",
+        default = ""
+      )
+
+    def draw(self, context) :
+        self.layout.prop(self, "texture_library")
+    #end draw
+
+#end ImportMakeHumanPreferences
+
+#+
+# Library search
+#
+# A library of .mhmat files is indexed into a database (see libindex),
+# which can then be searched from the sidebar of the 3D view. The
+# search state is kept on the window manager, so it is not saved with
+# the .blend file.
+#-
+
+_library_index = None
+
+def get_library_index() :
+    global _library_index
+    if _library_index == None :
+        _library_index = libindex.LibraryIndex()
+    #end if
+    return \
+        _library_index
+#end get_library_index
+
+def refresh_library_results(self, context) :
+    # reruns the search and fills in the results list; also the update
+    # function for the search properties.
+    search = context.window_manager.mhmat_library
+    search.results.clear()
+    for entry in get_library_index().search(search.text, search.only_valid) :
+        item = search.results.add()
+        item.filepath = entry.filepath
+        item.name = entry.name
+        item.tags = ", ".join(entry.tags)
+        item.description = entry.description or ""
+        item.maps = ", ".join(entry.maps)
+        if entry.diffuse_colour[0] != None :
+            item.colour = entry.diffuse_colour
+        #end if
+        item.valid = entry.valid
+        item.problems = entry.problems
+    #end for
+    search.active_index = min(search.active_index, len(search.results) - 1)
+#end refresh_library_results
+
+class LibraryResult(bpy.types.PropertyGroup) :
+    filepath : bpy.props.StringProperty(subtype = "FILE_PATH")
+    name : bpy.props.StringProperty()
+    tags : bpy.props.StringProperty()
+    description : bpy.props.StringProperty()
+    maps : bpy.props.StringProperty()
+    colour : bpy.props.FloatVectorProperty(subtype = "COLOR", size = 3, min = 0, max = 1, default = (1, 1, 1))
+    valid : bpy.props.BoolProperty()
+    problems : bpy.props.StringProperty()
+#end LibraryResult
+
+class LibrarySearch(bpy.types.PropertyGroup) :
+    root : bpy.props.StringProperty \
+      (
+        name = "Library",
+        description = "top-level directory of the .mhmat library to index",
+        subtype = "DIR_PATH"
+      )
+    text : bpy.props.StringProperty \
+      (
+        name = "Search",
+        description = "words to look for in material names, tags, descriptions and texture maps",
+        options = {"TEXTEDIT_UPDATE"},
+        update = refresh_library_results
+      )
+    only_valid : bpy.props.BoolProperty \
+      (
+        name = "Only Importable",
+        description = "leave out materials with missing or broken textures",
+        default = True,
+        update = refresh_library_results
+      )
+    results : bpy.props.CollectionProperty(type = LibraryResult)
+    active_index : bpy.props.IntProperty()
+#end LibrarySearch
+
+class MHMAT_UL_library_results(bpy.types.UIList) :
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index) :
+        row = layout.row(align = True)
+        row.prop(item, "colour", text = "")
+        row.label(text = item.name, icon = ("ERROR", "MATERIAL")[item.valid])
+        row.label(text = item.tags)
+    #end draw_item
+
+#end MHMAT_UL_library_results
+
+class IndexMakeHumanLibrary(bpy.types.Operator) :
+    bl_idname = "material.mhmat_index_library"
+    bl_label = "Update Library Index"
+    bl_description = "scan the library directory for new or changed .mhmat files"
+
+    def execute(self, context) :
+        search = context.window_manager.mhmat_library
+        if search.root == "" :
+            self.report({"ERROR"}, "no library directory specified")
+            return \
+                {"CANCELLED"}
+        #end if
+        try :
+            nr_files, nr_updated, nr_removed = get_library_index().update(bpy.path.abspath(search.root))
+        except OSError as why :
+            self.report({"ERROR"}, "cannot scan library: %s" % why)
+            return \
+                {"CANCELLED"}
+        #end try
+        refresh_library_results(self, context)
+        self.report \
+          (
+            {"INFO"},
+                "library has %d .mhmat files, %d updated, %d removed"
+            %
+                (nr_files, nr_updated, nr_removed)
+          )
+        return \
+            {"FINISHED"}
+    #end execute
+
+#end IndexMakeHumanLibrary
+
+class ImportFromMakeHumanLibrary(bpy.types.Operator, BatchImport) :
+    bl_idname = "material.mhmat_import_from_library"
+    bl_label = "Import from Library"
+    bl_description = "import the selected material from the library search results"
+
+    all_results : bpy.props.BoolProperty \
+      (
+        name = "All Results",
+        description = "import every material found by the search, not just the selected one",
+        default = False
+      )
+
+    def get_filepaths(self, context) :
+        search = context.window_manager.mhmat_library
+        if self.all_results :
+            filepaths = list(item.filepath for item in search.results)
+        elif 0 <= search.active_index < len(search.results) :
+            filepaths = [search.results[search.active_index].filepath]
+        else :
+            filepaths = []
+        #end if
+        return \
+            filepaths
+    #end get_filepaths
+
+#end ImportFromMakeHumanLibrary
+
+class MHMAT_PT_library(bpy.types.Panel) :
+    bl_label = "MakeHuman Material Library"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "MakeHuman"
+
+    def draw(self, context) :
+        search = context.window_manager.mhmat_library
+        layout = self.layout
+        row = layout.row(align = True)
+        row.prop(search, "root", text = "")
+        row.operator(IndexMakeHumanLibrary.bl_idname, text = "", icon = "FILE_REFRESH")
+        layout.prop(search, "text", text = "", icon = "VIEWZOOM")
+        layout.prop(search, "only_valid")
+        layout.template_list \
+          (
+            "MHMAT_UL_library_results", "",
+            search, "results",
+            search, "active_index"
+          )
+        if 0 <= search.active_index < len(search.results) :
+            item = search.results[search.active_index]
+            column = layout.column(align = True)
+            if item.description != "" :
+                column.label(text = item.description)
+            #end if
+            if item.maps != "" :
+                column.label(text = item.maps, icon = "TEXTURE")
+            #end if
+            for line in item.problems.split("\n") :
+                if line != "" :
+                    column.label(text = line, icon = "ERROR")
+                #end if
+            #end for
+        #end if
+        row = layout.row(align = True)
+        row.operator(ImportFromMakeHumanLibrary.bl_idname, text = "Import")
+        row.operator(ImportFromMakeHumanLibrary.bl_idname, text = "Import All").all_results = True
+    #end draw
+
+#end MHMAT_PT_library
+
+#+
+# Mainline
+#-
+
+def add_invoke_item(self, context) :
+    self.layout.operator(ImportMakeHumanMaterial.bl_idname, text = "MakeHuman Material")
+    self.layout.operator(ImportMakeHumanMaterials.bl_idname, text = "MakeHuman Materials (Batch)")
+    self.layout.operator(ImportMakeHumanBundle.bl_idname, text = "MakeHuman Asset Bundle")
+#end add_invoke_item
+
+def add_material_item(self, context) :
+    self.layout.operator(UseFullResolutionTextures.bl_idname)
+    self.layout.operator(ReloadMakeHumanMaterials.bl_idname)
+    self.layout.operator(MoveTexturesToLibrary.bl_idname)
+#end add_material_item
+
+_classes_ = \
+    (
+        ImportMakeHumanMaterial,
+        ImportMakeHumanMaterials,
+        ImportMakeHumanBundle,
+        UseFullResolutionTextures,
+        ReloadMakeHumanMaterials,
+        MoveTexturesToLibrary,
+        ImportMakeHumanPreferences,
+        LibraryResult,
+        LibrarySearch,
+        MHMAT_UL_library_results,
+        IndexMakeHumanLibrary,
+        ImportFromMakeHumanLibrary,
+        MHMAT_PT_library,
+    )
+
+def register() :
+    for ċlass in _classes_ :
+        bpy.utils.register_class(ċlass)
+    #end for
+    bpy.types.WindowManager.mhmat_library = bpy.props.PointerProperty(type = LibrarySearch)
+    bpy.types.TOPBAR_MT_file_import.append(add_invoke_item)
+    bpy.types.MATERIAL_MT_context_menu.append(add_material_item)
+#end register
+
+def unregister() :
+    global _library_index
+    set_watching(None)
+    if _library_index != None :
+        _library_index.close()
+        _library_index = None
+    #end if
+    del bpy.types.WindowManager.mhmat_library
+    bpy.types.MATERIAL_MT_context_menu.remove(add_material_item)
+    bpy.types.TOPBAR_MT_file_import.remove(add_invoke_item)
+    for ċlass in _classes_ :
+        bpy.utils.unregister_class(ċlass)
+    #end for
+#end unregister
+
+if __name__ == "__main__" :
+    register()
+#end if
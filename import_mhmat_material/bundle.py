@@ -0,0 +1,178 @@
+#+
+# Scanning of MakeHuman asset bundles: a directory containing one or
+# more meshes (.obj), the .mhclo files describing them, the .mhmat
+# files for their materials, textures, thumbnails and so on. The
+# directory is listed just once, producing a manifest of what is there
+# and which files go together. This module does not depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import collections
+if __package__ :
+    from . import \
+        mhmat, \
+        textures
+else :
+    import mhmat
+    import textures
+#end if
+
+BundleItem = collections.namedtuple \
+  (
+    "BundleItem",
+    (
+        "name",
+        "mhclo", # pathname of .mhclo file, or None for a bare .obj
+        "obj", # pathname of mesh, or None if not found
+        "materials", # list of pathnames of .mhmat files for the mesh, first is the default
+    )
+  )
+
+Manifest = collections.namedtuple \
+  (
+    "Manifest",
+    (
+        "dirname",
+        "items", # list of BundleItems
+        "other_materials", # .mhmat files not belonging to any item, e.g. alternative colours
+        "index", # textures.DirIndex with the directory listings, for checking
+          # texture references without looking at the files again
+        "failures", # messages for .mhclo files that could not be read
+    )
+  )
+
+def parse_mhclo(filepath) :
+    # returns a dict of the settings in a .mhclo file that matter for
+    # importing it: "name", "obj_file" and "material" (a list). The
+    # vertex data that follows is not needed. Raises OSError or
+    # UnicodeDecodeError if the file cannot be read.
+    result = {"name" : None, "obj_file" : None, "material" : []}
+    with open(filepath, "rt", encoding = "utf-8", errors = "replace") as infile :
+        for line in infile :
+            items = line.split(None, 1)
+            if len(items) == 2 :
+                keyword, value = items[0], items[1].strip()
+                if keyword == "verts" :
+                    break
+                elif keyword == "material" :
+                    result["material"].append(value)
+                elif keyword in ("name", "obj_file") :
+                    result[keyword] = value
+                #end if
+            #end if
+        #end for
+    #end with
+    return \
+        result
+#end parse_mhclo
+
+def scan_bundle(dirname, recursive = True) :
+    # lists the contents of the bundle directory and returns a Manifest.
+    index = textures.DirIndex()
+    if recursive :
+        pathnames = index.scan_tree(dirname)
+    else :
+        dirpath = os.path.normpath(os.path.abspath(dirname))
+        pathnames = sorted(os.path.join(dirpath, name) for name in index.listing(dirpath))
+    #end if
+    files = {}
+    for pathname in pathnames :
+        files.setdefault(os.path.splitext(pathname)[1].lower(), []).append(pathname)
+    #end for
+
+    def same_stem(pathname, ext) :
+        # returns the file in the same directory with the same name but
+        # the specified extension, or None if there is none.
+        stem = os.path.splitext(pathname)[0]
+        matches = list(p for p in files.get(ext, ()) if os.path.splitext(p)[0] == stem)
+        return \
+            (matches + [None])[0]
+    #end same_stem
+
+    def in_bundle(pathname) :
+        # returns the normalized pathname if the file exists, else None.
+        pathname = os.path.normpath(pathname)
+        if not index.isfile(pathname) :
+            pathname = None
+        #end if
+        return \
+            pathname
+    #end in_bundle
+
+#begin scan_bundle
+    items = []
+    claimed = set()
+    failures = []
+    for mhclo in files.get(".mhclo", ()) :
+        try :
+            settings = parse_mhclo(mhclo)
+        except (OSError, UnicodeDecodeError) as why :
+            # skip it; its mesh can still be picked up as a bare .obj
+            failures.append(mhmat.unreadable(mhclo, why).message)
+            continue
+        #end try
+        mhclo_dir = os.path.dirname(mhclo)
+        obj = None
+        if settings["obj_file"] != None :
+            obj = in_bundle(os.path.join(mhclo_dir, settings["obj_file"]))
+        #end if
+        if obj == None :
+            obj = same_stem(mhclo, ".obj")
+        #end if
+        materials = list \
+          (
+            m
+            for m in (in_bundle(os.path.join(mhclo_dir, name)) for name in settings["material"])
+            if m != None
+          )
+        if len(materials) == 0 and same_stem(mhclo, ".mhmat") != None :
+            materials.append(same_stem(mhclo, ".mhmat"))
+        #end if
+        items.append \
+          (
+            BundleItem
+              (
+                name = settings["name"] or os.path.splitext(os.path.basename(mhclo))[0],
+                mhclo = mhclo,
+                obj = obj,
+                materials = materials
+              )
+          )
+        claimed.update(materials)
+        claimed.add(obj)
+    #end for
+    for obj in files.get(".obj", ()) :
+        if obj not in claimed :
+            # mesh without a .mhclo
+            material = same_stem(obj, ".mhmat")
+            if material != None :
+                materials = [material]
+                claimed.add(material)
+            else :
+                materials = []
+            #end if
+            items.append \
+              (
+                BundleItem
+                  (
+                    name = os.path.splitext(os.path.basename(obj))[0],
+                    mhclo = None,
+                    obj = obj,
+                    materials = materials
+                  )
+              )
+        #end if
+    #end for
+    return \
+        Manifest \
+          (
+            dirname = dirname,
+            items = items,
+            other_materials = list(m for m in files.get(".mhmat", ()) if m not in claimed),
+            index = index,
+            failures = failures
+          )
+#end scan_bundle
@@ -0,0 +1,148 @@
+#+
+# Channel-packing of grayscale texture maps. The specular,
+# transparency, bump and displacement maps are single-channel data,
+# even though they are usually stored as RGB(A) files. So instead of
+# loading each one as a separate image, they can be combined into the
+# channels of a single RGBA image, saving texture memory and image
+# samplers in the shader. Packed images are written to a cache
+# directory under a name derived from the content hashes of the maps
+# that went into them, and then loaded like any other texture.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import hashlib
+import bpy
+from . import \
+    textures, \
+    imagecache, \
+    nodes, \
+    proxies
+
+packed_keywords = tuple(map.map_name for map in nodes.packed_channels)
+  # in channel order: R, G, B, A
+
+luma_weights = (0.2126, 0.7152, 0.0722)
+  # for reducing a colour texture to grayscale, same as Blender’s default
+
+pack_version = 1
+  # increment this if the packed image contents change
+
+def default_cache_dir() :
+    return \
+        os.path.join(proxies.cache_root(), "packed")
+#end default_cache_dir
+
+def would_pack(settings) :
+    # are there enough grayscale maps in settings to be worth packing.
+    return \
+        sum(settings.texture_pathname(k) != None for k in packed_keywords) >= 2
+#end would_pack
+
+def write_packed(sources, pathname) :
+    # combines the images from the files named in sources, one for each
+    # channel or None if unused, into a PNG file with the specified name.
+    # Images of different sizes are all scaled to the largest size.
+    import numpy
+      # only needed here, so the addon still loads without it when channel
+      # packing is not used
+    images = []
+    try :
+        for source in sources :
+            if source != None :
+                images.append(bpy.data.images.load(source))
+            else :
+                images.append(None)
+            #end if
+        #end for
+        width = max(image.size[0] for image in images if image != None)
+        height = max(image.size[1] for image in images if image != None)
+        result = numpy.zeros(width * height * 4, dtype = numpy.float32)
+        result[3::4] = 1
+          # opaque if there is no displacement map
+        pixels = numpy.empty(width * height * 4, dtype = numpy.float32)
+        for channel, image in enumerate(images) :
+            if image != None :
+                if tuple(image.size) != (width, height) :
+                    image.scale(width, height)
+                #end if
+                image.pixels.foreach_get(pixels)
+                result[channel::4] = \
+                    (
+                        pixels[0::4] * luma_weights[0]
+                    +
+                        pixels[1::4] * luma_weights[1]
+                    +
+                        pixels[2::4] * luma_weights[2]
+                    )
+            #end if
+        #end for
+        packed = bpy.data.images.new("mhmat channel pack", width, height, alpha = True, is_data = True)
+        packed.pixels.foreach_set(result)
+        temp = "%s.%d.png" % (pathname, os.getpid())
+        packed.filepath_raw = temp
+        packed.file_format = "PNG"
+        packed.save()
+        os.replace(temp, pathname)
+          # so a packed image is never seen half-written
+        bpy.data.images.remove(packed)
+    finally :
+        for image in images :
+            if image != None :
+                bpy.data.images.remove(image)
+            #end if
+        #end for
+    #end try
+#end write_packed
+
+def load_packed(settings, loader, cache_dir = None) :
+    # returns a channel-packed image of the grayscale maps in settings,
+    # loaded with the specified imagecache.ImageLoader, or None if there
+    # are not enough of them to be worth packing. If the loader has proxies
+    # for any of the maps, these are packed instead.
+    image = None
+    if would_pack(settings) :
+        if cache_dir == None :
+            cache_dir = default_cache_dir()
+        #end if
+        pathnames = tuple(settings.texture_pathname(k) for k in packed_keywords)
+        key = hashlib.sha256 \
+          (
+            repr
+              (
+                (
+                    pack_version,
+                    tuple
+                      (
+                        (textures.content_hash(p), (0, loader.proxy_size)[p in loader.proxies])
+                        if p != None else None
+                        for p in pathnames
+                      ),
+                )
+              ).encode()
+          ).hexdigest()
+        pathname = os.path.join(cache_dir, key[:2], "%s.png" % key)
+        if not os.path.exists(pathname) :
+            os.makedirs(os.path.dirname(pathname), exist_ok = True)
+            with loader.profile.phase("channel_pack") :
+                write_packed \
+                  (
+                    tuple(loader.proxies.get(p, p) if p != None else None for p in pathnames),
+                    pathname
+                  )
+            #end with
+        #end if
+        image = loader.load(pathname, False)
+        if imagecache.PACKED_PROP not in image :
+            # newly loaded
+            image.name = "%s packed.png" % settings.name
+            image.alpha_mode = "CHANNEL_PACKED"
+              # alpha is displacement, not transparency
+            image[imagecache.PACKED_PROP] = True
+        #end if
+    #end if
+    return \
+        image
+#end load_packed
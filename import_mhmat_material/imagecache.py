@@ -0,0 +1,225 @@
+#+
+# Loading of texture images into Blender, reusing images that have
+# already been loaded from the same or byte-identical files.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import bpy
+from . import \
+    textures, \
+    texlib, \
+    profiling
+
+#+
+# Each image loaded by this module is tagged with a custom property
+# recording the content hash of the file it came from. This allows
+# recognizing previously-loaded textures even in a .blend file saved
+# and reopened since, and means byte-identical files stored under
+# different names map to the same image.
+#-
+
+HASH_PROP = "mhmat_hash"
+HAS_ALPHA_PROP = "mhmat_has_alpha"
+  # whether the file really has an alpha channel, since Blender always
+  # reports 4 channels even for RGB images
+PROXY_PROP = "mhmat_proxy_size"
+  # present on images loaded from a reduced-resolution proxy instead of
+  # the file with the content hash, giving the proxy size
+PACKED_PROP = "mhmat_channel_packed"
+  # present on images made by channelpack, combining several grayscale maps
+
+_index = {} # (content hash, is_colour, proxy size) => image name
+
+def image_is_colour(image) :
+    return \
+        image.colorspace_settings.name != "Non-Color"
+#end image_is_colour
+
+def image_key(image) :
+    # returns the index key for an image loaded by this module, or None if
+    # it was not.
+    content_hash = image.get(HASH_PROP)
+    if content_hash != None :
+        key = (content_hash, image_is_colour(image), image.get(PROXY_PROP, 0))
+    else :
+        key = None
+    #end if
+    return \
+        key
+#end image_key
+
+def rebuild_index() :
+    # rescans bpy.data.images for images previously loaded by this module.
+    _index.clear()
+    for image in bpy.data.images :
+        key = image_key(image)
+        if key != None :
+            _index.setdefault(key, image.name)
+        #end if
+    #end for
+#end rebuild_index
+
+def _lookup(key) :
+    image = None
+    name = _index.get(key)
+    if name != None :
+        image = bpy.data.images.get(name)
+        if image != None and image_key(image) != key :
+            image = None
+        #end if
+    #end if
+    return \
+        image
+#end _lookup
+
+def find_image(content_hash, is_colour, proxy_size = 0) :
+    # returns an existing image loaded from a file with the specified
+    # content hash and colour space, or from its proxy of the specified
+    # size if nonzero, or None if there is none.
+    key = (content_hash, is_colour, proxy_size)
+    image = _lookup(key)
+    if image == None and key in _index :
+        # stale entry, e.g. image renamed or deleted
+        rebuild_index()
+        image = _lookup(key)
+    #end if
+    return \
+        image
+#end find_image
+
+#+
+# Texture storage
+#
+# Images can be packed into the .blend file as they are loaded, packed
+# all at once at the end of the import (so nothing is packed if the
+# import fails), left as links to the original files, or copied into the
+# shared texture library (see texlib) and linked from there.
+#-
+
+storage_modes = \
+    ( # items for EnumProperty
+        ("PACK", "Pack", "pack each image into the .blend file as it is loaded"),
+        ("DEFERRED", "Pack at End", "pack all newly-loaded images in one step once the import is done"),
+        ("LINK", "Link", "do not pack images, refer to the original files by relative path"),
+        ("LIBRARY", "Shared Library", "copy images into the shared texture library, once for each distinct file, and link to the copies"),
+    )
+
+def scrub_image_path(image, pathname) :
+    # wipe all traces of original source file path from a packed image
+    image.filepath = "//textures/%s" % os.path.split(pathname)[1]
+    image.filepath_raw = image.filepath
+    for item in image.packed_files :
+        item.filepath = image.filepath
+    #end for
+#end scrub_image_path
+
+class ImageLoader :
+    # loads images for one import operation, according to the chosen
+    # storage mode. proxies is a dict mapping texture pathnames to the
+    # pathnames of reduced-resolution proxies to load instead, as returned
+    # from proxies.generate, all of size proxy_size. library_dir is the
+    # shared texture library for the "LIBRARY" storage mode, default
+    # texlib.default_library_dir(). Call finish() once all the materials
+    # have been built.
+
+    def __init__(self, storage = "PACK", scrub_paths = True, profile = profiling.null_profile, proxies = None, proxy_size = 0, library_dir = None) :
+        self.storage = storage
+        self.scrub_paths = scrub_paths
+        self.profile = profile
+        self.proxies = proxies or {}
+        self.proxy_size = proxy_size
+        self.library_dir = library_dir or texlib.default_library_dir()
+        self.deferred = [] # list of (image, pathname) to pack in finish()
+        self.nr_loaded = 0
+        self.nr_reused = 0
+    #end __init__
+
+    def load(self, pathname, is_colour) :
+        # returns an image for the specified texture file, loading it only
+        # if it has not been loaded already.
+        profile = self.profile
+        with profile.phase("hash") :
+            content_hash = textures.content_hash(pathname)
+        #end with
+        load_pathname = self.proxies.get(pathname)
+        if load_pathname != None :
+            proxy_size = self.proxy_size
+        else :
+            load_pathname = pathname
+            proxy_size = 0
+        #end if
+        image = find_image(content_hash, is_colour, proxy_size)
+        if image == None :
+            if self.storage == "LIBRARY" :
+                with profile.phase("library_copy") :
+                    load_pathname = texlib.add_file(self.library_dir, load_pathname)
+                #end with
+                  # linked by absolute path, so it stays valid wherever the
+                  # .blend file is moved
+            #end if
+            with profile.phase("image_load") :
+                image = bpy.data.images.load(load_pathname)
+            #end with
+            if profile.enabled :
+                profile.count("texture_read_bytes", os.path.getsize(load_pathname))
+            #end if
+            if not is_colour :
+                image.colorspace_settings.name = "Non-Color"
+            #end if
+            image.name = os.path.split(pathname)[1]
+            if self.storage == "PACK" :
+                self.pack(image)
+                if self.scrub_paths :
+                    scrub_image_path(image, pathname)
+                #end if
+            elif self.storage == "DEFERRED" :
+                self.deferred.append((image, pathname))
+            elif self.storage == "LINK" :
+                if bpy.data.filepath != "" :
+                    image.filepath = bpy.path.relpath(load_pathname)
+                #end if
+                  # else Blender will make it relative when the file is first saved
+            #end if
+            image[HASH_PROP] = content_hash
+            if proxy_size != 0 :
+                image[PROXY_PROP] = proxy_size
+            #end if
+            has_alpha = textures.probe(pathname).has_alpha
+            if has_alpha != None :
+                image[HAS_ALPHA_PROP] = has_alpha
+            #end if
+            _index[(content_hash, is_colour, proxy_size)] = image.name
+            self.nr_loaded += 1
+            profile.count("images_loaded")
+        else :
+            self.nr_reused += 1
+            profile.count("images_reused")
+        #end if
+        return \
+            image
+    #end load
+
+    def pack(self, image) :
+        with self.profile.phase("image_pack") :
+            image.pack()
+        #end with
+        if self.profile.enabled and image.packed_file != None :
+            self.profile.count("texture_packed_bytes", image.packed_file.size)
+        #end if
+    #end pack
+
+    def finish(self) :
+        # packs any images whose packing was deferred.
+        for image, pathname in self.deferred :
+            self.pack(image)
+            if self.scrub_paths :
+                scrub_image_path(image, pathname)
+            #end if
+        #end for
+        self.deferred = []
+    #end finish
+
+#end ImageLoader
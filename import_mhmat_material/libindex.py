@@ -0,0 +1,281 @@
+#+
+# Searchable index of a library of .mhmat files. A library root is
+# scanned into an SQLite database recording, for each .mhmat file, its
+# name, tags and description, which texture maps it has, its diffuse
+# colour and whether it passed validation. Rescanning only reparses
+# files that have changed since, or whose textures have. This module
+# does not depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import collections
+import sqlite3
+if __package__ :
+    from . import \
+        mhmat, \
+        proxies
+else :
+    import mhmat
+    import proxies
+#end if
+
+index_version = 2
+  # increment this whenever the recorded information changes, to force
+  # a full rescan
+
+IndexEntry = collections.namedtuple \
+  (
+    "IndexEntry",
+    (
+        "filepath",
+        "name",
+        "tags", # tuple of lowercase tags
+        "description", # or None
+        "maps", # tuple of texture keywords present
+        "diffuse_colour", # (r, g, b)
+        "valid", # whether the material can be imported
+        "problems", # messages explaining why not, joined by newlines
+    )
+  )
+
+def default_pathname() :
+    return \
+        os.path.join(proxies.cache_root(), "library.db")
+#end default_pathname
+
+def file_stat(pathname) :
+    # returns a tuple (present, mtime_ns, size) for the specified file.
+    try :
+        info = os.stat(pathname)
+    except OSError :
+        result = (False, None, None)
+    else :
+        result = (True, info.st_mtime_ns, info.st_size)
+    #end try
+    return \
+        result
+#end file_stat
+
+class LibraryIndex :
+
+    def __init__(self, pathname = None) :
+        if pathname == None :
+            pathname = default_pathname()
+        #end if
+        os.makedirs(os.path.dirname(pathname), exist_ok = True)
+        self.pathname = pathname
+        self.conn = sqlite3.connect(pathname, timeout = 60)
+        self.conn.executescript \
+          (
+            "pragma journal_mode = wal;\n"
+            "create table if not exists meta (key text primary key, value text);\n"
+            "create table if not exists material\n"
+            "  (path text primary key, root text, mtime_ns integer, size integer,\n"
+            "    name text, description text, maps text,\n"
+            "    diffuse_r real, diffuse_g real, diffuse_b real,\n"
+            "    valid integer, problems text);\n"
+            "create index if not exists material_root on material (root);\n"
+            "create table if not exists tag (mhmat_path text, tag text);\n"
+            "create index if not exists tag_mhmat on tag (mhmat_path);\n"
+            "create index if not exists tag_tag on tag (tag);\n"
+            "create table if not exists texture\n"
+            "  (mhmat_path text, path text, present integer, mtime_ns integer, size integer);\n"
+            "create index if not exists texture_mhmat on texture (mhmat_path);\n"
+          )
+        version = self.conn.execute("select value from meta where key = 'version'").fetchone()
+        if version == None or int(version[0]) != index_version :
+            with self.conn :
+                for table in ("material", "tag", "texture") :
+                    self.conn.execute("delete from %s" % table)
+                #end for
+                self.conn.execute \
+                  (
+                    "insert or replace into meta (key, value) values ('version', ?)",
+                    (str(index_version),)
+                  )
+            #end with
+        #end if
+    #end __init__
+
+    def close(self) :
+        self.conn.close()
+    #end close
+
+    def is_current(self, path, mtime_ns, size) :
+        # is the entry for the specified .mhmat file, recorded with the
+        # specified mtime and size, still valid.
+        current = file_stat(path) == (True, mtime_ns, size)
+        if current :
+            for texpath, present, tex_mtime_ns, tex_size in self.conn.execute \
+              (
+                "select path, present, mtime_ns, size from texture where mhmat_path = ?",
+                (path,)
+              ) \
+            :
+                if file_stat(texpath) != (bool(present), tex_mtime_ns, tex_size) :
+                    current = False
+                    break
+                #end if
+            #end for
+        #end if
+        return \
+            current
+    #end is_current
+
+    def forget(self, path) :
+        # removes the entry for the specified .mhmat file. Caller must
+        # commit.
+        for table, column in (("material", "path"), ("tag", "mhmat_path"), ("texture", "mhmat_path")) :
+            self.conn.execute("delete from %s where %s = ?" % (table, column), (path,))
+        #end for
+    #end forget
+
+    def record(self, root, path, settings, errors) :
+        # (re)creates the entry for the specified .mhmat file from the
+        # results of mhmat.load_and_validate. Caller must commit.
+        self.forget(path)
+        present, mtime_ns, size = file_stat(path)
+        if present :
+            if settings != None :
+                name = settings.name
+                description = settings.description
+                maps = ",".join(keyword for linenr, keyword, texname in settings.textures)
+                diffuse = settings.diffuseColor[:3]
+                tags = sorted(set(settings.tags))
+                texpaths = sorted \
+                  (
+                    set
+                      (
+                        settings.texture_pathname(keyword)
+                        for linenr, keyword, texname in settings.textures
+                      )
+                  )
+            else :
+                name = os.path.basename(path)
+                description = None
+                maps = ""
+                diffuse = (None, None, None)
+                tags = []
+                texpaths = []
+            #end if
+            self.conn.execute \
+              (
+                "insert into material (path, root, mtime_ns, size, name, description, maps,"
+                " diffuse_r, diffuse_g, diffuse_b, valid, problems)"
+                " values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, root, mtime_ns, size, name, description, maps)
+              +
+                tuple(diffuse)
+              +
+                (int(len(errors) == 0), "\n".join(errors))
+              )
+            self.conn.executemany \
+              (
+                "insert into tag (mhmat_path, tag) values (?, ?)",
+                list((path, tag) for tag in tags)
+              )
+            self.conn.executemany \
+              (
+                "insert into texture (mhmat_path, path, present, mtime_ns, size)"
+                " values (?, ?, ?, ?, ?)",
+                list((path, texpath) + file_stat(texpath) for texpath in texpaths)
+              )
+        #end if
+    #end record
+
+    def update(self, root, recursive = True, nr_workers = None) :
+        # brings the index up to date with the .mhmat files under the
+        # specified root directory, returning a 3-tuple (nr_files,
+        # nr_updated, nr_removed).
+        root = os.path.normpath(os.path.abspath(root))
+        filepaths = mhmat.find_mhmat_files(root, recursive)
+        known = dict \
+          (
+            (path, (mtime_ns, size))
+            for path, mtime_ns, size in self.conn.execute
+              (
+                "select path, mtime_ns, size from material where root = ?",
+                (root,)
+              )
+          )
+        stale = list \
+          (
+            path
+            for path in filepaths
+            if path not in known or not self.is_current(path, *known[path])
+          )
+        removed = set(known) - set(filepaths)
+        with self.conn :
+            for path in removed :
+                self.forget(path)
+            #end for
+            for path, settings, errors in mhmat.load_all(stale, nr_workers) :
+                self.record(root, path, settings, errors)
+            #end for
+        #end with
+        return \
+            len(filepaths), len(stale), len(removed)
+    #end update
+
+    def search(self, text = "", only_valid = False, limit = 500) :
+        # returns a list of IndexEntry for the materials matching all the
+        # words in text, each of which may occur in the name, description,
+        # a tag or the name of a texture map, ignoring case.
+        conditions = []
+        params = []
+        for word in text.split() :
+            pattern = "%%%s%%" % word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append \
+              (
+                "(name like ? escape '\\' or description like ? escape '\\'"
+                " or maps like ? escape '\\'"
+                " or path in (select mhmat_path from tag where tag like ? escape '\\'))"
+              )
+            params.extend((pattern,) * 4)
+        #end for
+        if only_valid :
+            conditions.append("valid != 0")
+        #end if
+        query = \
+            (
+                "select path, name, description, maps, diffuse_r, diffuse_g, diffuse_b,"
+                " valid, problems from material"
+            )
+        if len(conditions) != 0 :
+            query += " where " + " and ".join(conditions)
+        #end if
+        query += " order by name, path limit ?"
+        params.append(limit)
+        result = []
+        for path, name, description, maps, r, g, b, valid, problems in self.conn.execute(query, params) :
+            result.append \
+              (
+                IndexEntry
+                  (
+                    filepath = path,
+                    name = name,
+                    tags = tuple
+                      (
+                        row[0]
+                        for row in self.conn.execute
+                          (
+                            "select tag from tag where mhmat_path = ? order by tag",
+                            (path,)
+                          )
+                      ),
+                    description = description,
+                    maps = tuple(m for m in maps.split(",") if m != ""),
+                    diffuse_colour = (r, g, b),
+                    valid = bool(valid),
+                    problems = problems
+                  )
+              )
+        #end for
+        return \
+            result
+    #end search
+
+#end LibraryIndex
@@ -0,0 +1,163 @@
+#+
+# Index of imported materials by fingerprint, so that importing a
+# material definition identical to one already imported can return the
+# existing material instead of building a duplicate.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import json
+import bpy
+from . import \
+    mhmat
+
+#+
+# The fingerprint (see mhmat.fingerprint) is stored on each material as
+# a custom property, so the index can be rebuilt from the contents of
+# the .blend file at any time.
+#-
+
+FINGERPRINT_PROP = "mhmat_fingerprint"
+
+_index = {} # fingerprint => material name
+
+def rebuild_index() :
+    # rescans bpy.data.materials for fingerprinted materials.
+    _index.clear()
+    for material in bpy.data.materials :
+        fingerprint = material.get(FINGERPRINT_PROP)
+        if fingerprint != None :
+            _index.setdefault(fingerprint, material.name)
+        #end if
+    #end for
+#end rebuild_index
+
+def _lookup(fingerprint) :
+    material = None
+    name = _index.get(fingerprint)
+    if name != None :
+        material = bpy.data.materials.get(name)
+        if material != None and material.get(FINGERPRINT_PROP) != fingerprint :
+            material = None
+        #end if
+    #end if
+    return \
+        material
+#end _lookup
+
+def find_material(fingerprint) :
+    # returns an existing material with the specified fingerprint, or None
+    # if there is none.
+    material = _lookup(fingerprint)
+    if material == None and fingerprint in _index :
+        # stale entry, e.g. material renamed or deleted
+        rebuild_index()
+        material = _lookup(fingerprint)
+    #end if
+    return \
+        material
+#end find_material
+
+def add_material(material, fingerprint) :
+    # records the fingerprint for a newly-built material.
+    material[FINGERPRINT_PROP] = fingerprint
+    _index[fingerprint] = material.name
+#end add_material
+
+#+
+# Reloading
+#
+# Each imported material also records the .mhmat file it came from,
+# and the modification times and sizes of that and its texture files,
+# so it can be checked for changes and brought up to date later. If a
+# reload fails, the state of the files at the time is recorded too, so
+# the failure need not be retried (and reported) until they change.
+#-
+
+SOURCE_PROP = "mhmat_source"
+MTIMES_PROP = "mhmat_mtimes"
+  # JSON-encoded dict mapping "mhmat" or texture keyword to [mtime_ns, size],
+  # or null if the file is missing
+FAILED_PROP = "mhmat_failed"
+  # JSON-encoded dict as for MTIMES_PROP, for the state of the files when
+  # the last reload failed; absent if it succeeded
+
+def _file_mtime(pathname) :
+    try :
+        info = os.stat(pathname)
+    except OSError :
+        result = None
+    else :
+        result = [info.st_mtime_ns, info.st_size]
+    #end try
+    return \
+        result
+#end _file_mtime
+
+def source_mtimes(settings) :
+    # returns the dict for MTIMES_PROP for the current state of the files
+    # that settings was loaded from.
+    result = {"mhmat" : _file_mtime(settings.filepath)}
+    for linenr, keyword, texname in settings.textures :
+        result[keyword] = _file_mtime(settings.texture_pathname(keyword))
+    #end for
+    return \
+        result
+#end source_mtimes
+
+def current_mtimes(source) :
+    # returns the dict for MTIMES_PROP for the current state of the
+    # specified .mhmat file and the textures it references. Only the
+    # .mhmat file itself is included if it cannot be read.
+    try :
+        settings, diagnostics = mhmat.load_scan(source)
+          # cheap if the file has not changed, since it will be cached
+    except (OSError, UnicodeDecodeError) :
+        result = {"mhmat" : _file_mtime(source)}
+    else :
+        result = source_mtimes(settings)
+    #end try
+    return \
+        result
+#end current_mtimes
+
+def record_source(material, settings) :
+    # records where the material was imported from, and the current state
+    # of its files.
+    material[SOURCE_PROP] = settings.filepath
+    material[MTIMES_PROP] = json.dumps(source_mtimes(settings))
+    if FAILED_PROP in material :
+        del material[FAILED_PROP]
+    #end if
+#end record_source
+
+def record_failure(material) :
+    # records that the material could not be reloaded from its files in
+    # their current state.
+    material[FAILED_PROP] = json.dumps(current_mtimes(material[SOURCE_PROP]))
+#end record_failure
+
+def is_stale(material, retry_failed = True) :
+    # has the .mhmat file or any of the textures of an imported material
+    # changed since it was imported or last reloaded. If not retry_failed,
+    # a material whose last reload failed only counts as stale if its
+    # files have changed again since then.
+    source = material.get(SOURCE_PROP)
+    if source != None :
+        current = current_mtimes(source)
+        try :
+            recorded = json.loads(material.get(MTIMES_PROP, "{}"))
+            failed = json.loads(material.get(FAILED_PROP, "null"))
+        except ValueError :
+            recorded = None
+            failed = None
+        #end try
+        stale = current != recorded and (retry_failed or current != failed)
+    else :
+        stale = False
+    #end if
+    return \
+        stale
+#end is_stale
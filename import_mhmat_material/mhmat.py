@@ -0,0 +1,671 @@
+#+
+# Parser for MakeHuman .mhmat material definitions. This module does
+# not depend on bpy, so it can be shared between the Blender addon and
+# standalone scripts like validate_mhmat.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import collections
+import concurrent.futures
+import hashlib
+import itertools
+import threading
+if __package__ :
+    from . import textures
+else :
+    # imported as standalone module, e.g. from validate_mhmat
+    import textures
+#end if
+
+class Failure(Exception) :
+
+    def __init__(self, msg) :
+        self.msg = msg
+    #end __init__
+
+#end Failure
+
+#+
+# Keyword table
+#
+# This is built just once, at module load time. Texture keywords are
+# converted to the file name as given in the .mhmat file; it is up to
+# the caller to resolve this (see MaterialSettings.texture_pathname)
+# and actually load the image.
+#-
+
+convert_float = lambda words : float(words[0])
+
+def convert_colour(words) :
+    return \
+        tuple(float(c) for c in words) + (1,)
+#end convert_colour
+
+def convert_bool(words) :
+    word = words[0].lower()
+    if word in ("true", "1") :
+        result = True
+    elif word in ("false", "0") :
+        result = False
+    else :
+        raise ValueError("not a boolean")
+    #end if
+    return \
+        result
+#end convert_bool
+
+def def_convert_float_upto(maxval) :
+
+    def convert(s) :
+        val = float(s[0])
+        if val < 0 or val > maxval :
+            raise ValueError("out of range")
+        #end if
+        return \
+            val
+    #end convert
+
+#begin def_convert_float_upto
+    return \
+        convert
+#end def_convert_float_upto
+
+convert_texture = lambda words : " ".join(words)
+
+def texture_entry(is_colour) :
+    return \
+        {
+            "convert" : convert_texture,
+            "nr_args" : None, # rest of line, so file names may contain spaces
+            "default" : None,
+            "texture" : True,
+            "is_colour" : is_colour,
+        }
+#end texture_entry
+
+valid_keywords = \
+    {
+        "diffuseColor" :
+            {
+                "convert" : convert_colour,
+                "nr_args" : 3,
+                "default" : (1, 1, 1, 1),
+            },
+        # "specularColor" not implemented
+        "shininess" :
+            {
+                "convert" : def_convert_float_upto(1),
+                "nr_args" : 1,
+                "default" : 0,
+            },
+        "emissiveColor" :
+            {
+                "convert" : convert_colour,
+                "nr_args" : 3,
+                "default" : (0, 0, 0, 1),
+            },
+        "opacity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "diffuseTexture" : texture_entry(True),
+        "bumpmapTexture" : texture_entry(False),
+        "bumpmapIntensity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "normalmapTexture" : texture_entry(False),
+        "normalmapIntensity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "displacementmapTexture" : texture_entry(False),
+        "displacementmapIntensity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "specularmapTexture" : texture_entry(True),
+        "specularmapIntensity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "transparencymapTexture" : texture_entry(False),
+        "transparencymapIntensity" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "sssEnabled" :
+            {
+                "convert" : convert_bool,
+                "nr_args" : 1,
+                "default" : False,
+            },
+        "sssRScale" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "sssGScale" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+        "sssBScale" :
+            {
+                "convert" : convert_float,
+                "nr_args" : 1,
+                "default" : 1,
+            },
+    }
+
+ignored_keywords = \
+    { # to be ignored quietly
+        "alphaToCoverage", "castShadows", "name", "receiveShadows",
+        "shader", "shaderConfig", "transparent", "viewPortColor",
+        "viewPortAlpha",
+    }
+
+descriptive_keywords = {"description", "tag"}
+  # not used for building the material, but kept for searching (see libindex)
+
+texture_keywords = tuple(k for k in valid_keywords if valid_keywords[k].get("texture", False))
+
+#+
+# Parsed material record
+#-
+
+class MaterialSettings(collections.namedtuple \
+  (
+    "MaterialSettings",
+    ("name", "filepath", "textures", "warnings", "tags", "description")
+  +
+    tuple(valid_keywords.keys())
+  )) :
+    # immutable record of the contents of a .mhmat file. Besides one field
+    # per valid keyword, there is:
+    #     name -- the basename of the .mhmat file (the name field from the
+    #         file itself is not used)
+    #     filepath -- the .mhmat file that was parsed
+    #     textures -- tuple of (linenr, keyword, filename) for each texture
+    #         reference, in file order
+    #     warnings -- tuple of warning messages about the file contents
+    #     tags -- tuple of the tag values, lowercased, in file order
+    #     description -- the description text, or None if there is none
+
+    __slots__ = ()
+
+    def texture_pathname(self, keyword) :
+        # returns the full pathname of the texture file for the specified
+        # keyword, or None if the material does not reference one.
+        name = getattr(self, keyword)
+        if name != None :
+            result = os.path.join(os.path.dirname(self.filepath), name)
+        else :
+            result = None
+        #end if
+        return \
+            result
+    #end texture_pathname
+
+#end MaterialSettings
+
+class Diagnostic(collections.namedtuple \
+  (
+    "Diagnostic",
+    ("filepath", "linenr", "keyword", "severity", "text")
+  )) :
+    # a problem found with a .mhmat file. severity is "error" if it stops
+    # the material from being imported, "warning" otherwise. linenr and
+    # keyword are None if the problem is with the file as a whole, such
+    # as it being unreadable. text describes the problem, without saying
+    # where it is; message is the full text for reporting.
+
+    __slots__ = ()
+
+    @property
+    def message(self) :
+        if self.linenr != None :
+            where = "file %s, line %d" % (self.filepath, self.linenr)
+        else :
+            where = "file %s" % self.filepath
+        #end if
+        return \
+            "import_mhmat %s: %s: %s" % (self.severity, where, self.text)
+    #end message
+
+#end Diagnostic
+
+def unreadable(filepath, why) :
+    # returns a Diagnostic for a .mhmat file that could not be read
+    # because of the exception why.
+    if isinstance(why, OSError) and why.strerror != None :
+        text = why.strerror
+          # without the pathname, which might not be the one the caller gave
+    else :
+        text = str(why)
+    #end if
+    return \
+        Diagnostic \
+          (
+            filepath = filepath,
+            linenr = None,
+            keyword = None,
+            severity = "error",
+            text = text
+          )
+#end unreadable
+
+def tokenize(lines) :
+    # generator which yields (linenr, keyword, rest) for each non-blank,
+    # non-comment line in lines.
+    linenr = 0
+    for line in lines :
+        linenr += 1
+        line = line.strip()
+        if not (line == "" or line.startswith("#") or line.startswith("//")) :
+            items = line.split()
+            yield linenr, items[0], items[1:]
+        #end if
+    #end for
+#end tokenize
+
+def scan(filepath) :
+    # parses the specified .mhmat file, returning a 2-tuple (settings,
+    # diagnostics) where diagnostics is a list of Diagnostic for all the
+    # problems found in the file, rather than stopping at the first one.
+    # A keyword with an invalid value keeps its default in settings.
+    # Raises OSError or UnicodeDecodeError if the file cannot be read.
+    values = dict((keyword, entry["default"]) for keyword, entry in valid_keywords.items())
+    textures = []
+    diagnostics = []
+    tags = []
+    description = None
+    with open(filepath, "rt", encoding = "utf8") as infile :
+        for linenr, keyword, rest in tokenize(infile) :
+            entry = valid_keywords.get(keyword)
+            if entry != None :
+                try :
+                    if (
+                            len(rest) == 0
+                        or
+                            entry["nr_args"] != None and len(rest) != entry["nr_args"]
+                    ) :
+                        raise ValueError("wrong nr args")
+                    #end if
+                    values[keyword] = entry["convert"](rest)
+                except ValueError as err :
+                    diagnostics.append \
+                      (
+                        Diagnostic
+                          (
+                            filepath = filepath,
+                            linenr = linenr,
+                            keyword = keyword,
+                            severity = "error",
+                            text = "bad value for keyword %s" % repr(keyword)
+                          )
+                      )
+                else :
+                    if keyword in texture_keywords :
+                        textures.append((linenr, keyword, values[keyword]))
+                    #end if
+                #end try
+            elif keyword in descriptive_keywords :
+                if len(rest) != 0 :
+                    if keyword == "tag" :
+                        tags.append(" ".join(rest).lower())
+                    else :
+                        description = " ".join(rest)
+                    #end if
+                #end if
+            elif keyword not in ignored_keywords :
+                diagnostics.append \
+                  (
+                    Diagnostic
+                      (
+                        filepath = filepath,
+                        linenr = linenr,
+                        keyword = keyword,
+                        severity = "warning",
+                        text = "unrecognized keyword %s" % repr(keyword)
+                      )
+                  )
+            #end if
+        #end for
+    #end with
+    settings = MaterialSettings \
+      (
+        name = os.path.basename(filepath),
+        filepath = filepath,
+        textures = tuple(textures),
+        warnings = tuple(d.message for d in diagnostics if d.severity == "warning"),
+        tags = tuple(tags),
+        description = description,
+        **values
+      )
+    return \
+        settings, diagnostics
+#end scan
+
+def error_messages(diagnostics) :
+    # returns a list of the messages for those diagnostics that are errors.
+    return \
+        list(d.message for d in diagnostics if d.severity == "error")
+#end error_messages
+
+def parse(filepath) :
+    # parses the specified .mhmat file and returns a MaterialSettings
+    # record. Raises Failure if any keyword has an invalid value.
+    settings, diagnostics = scan(filepath)
+    errors = error_messages(diagnostics)
+    if len(errors) != 0 :
+        raise Failure("; ".join(errors))
+    #end if
+    return \
+        settings
+#end parse
+
+#+
+# Fingerprinting
+#-
+
+fingerprint_version = 1
+  # increment this if make_material changes in a way that should stop
+  # existing materials from being reused
+
+def fingerprint(settings, texture_hashes, extra = ()) :
+    # returns a canonical hash string identifying the material that would be
+    # built from settings. texture_hashes is a dict mapping each texture
+    # keyword in settings to the content hash of the file it refers to, so
+    # the fingerprint does not depend on the names of the files, only their
+    # contents. extra is a tuple of any further values that affect how the
+    # material is built, such as import options.
+    items = [("version", fingerprint_version)]
+    for keyword in valid_keywords :
+        value = getattr(settings, keyword)
+        if keyword in texture_keywords :
+            if value != None :
+                value = texture_hashes[keyword]
+            #end if
+        elif isinstance(value, tuple) :
+            value = tuple(float(v) for v in value)
+        elif not isinstance(value, bool) :
+            value = float(value)
+        #end if
+        items.append((keyword, value))
+    #end for
+    items.append(("extra", tuple(extra)))
+    return \
+        hashlib.sha256(repr(items).encode()).hexdigest()
+#end fingerprint
+
+#+
+# Parse cache
+#
+# Parsed records are remembered, keyed on the file’s pathname,
+# modification time and size, so repeatedly importing or validating
+# the same files does not keep reparsing them. The least-recently-used
+# entries are discarded once there are more than cache_size of them.
+#-
+
+cache_size = 1024
+_parse_cache = collections.OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+def load_scan(filepath) :
+    # returns the same as scan for the specified .mhmat file, parsing it
+    # only if it is not already in the cache. settings.filepath is always
+    # absolute, but the diagnostics and settings.warnings refer to the file
+    # by filepath as given.
+    abspath = os.path.abspath(filepath)
+    info = os.stat(abspath)
+    key = (abspath, info.st_mtime_ns, info.st_size)
+    with _parse_cache_lock :
+        result = _parse_cache.get(key)
+        if result != None :
+            _parse_cache.move_to_end(key)
+        #end if
+    #end with
+    if result == None :
+        result = scan(abspath)
+        with _parse_cache_lock :
+            _parse_cache[key] = result
+            while len(_parse_cache) > cache_size :
+                _parse_cache.popitem(last = False)
+            #end while
+        #end with
+    #end if
+    settings, diagnostics = result
+    if filepath != abspath :
+        diagnostics = list(d._replace(filepath = filepath) for d in diagnostics)
+        settings = settings._replace \
+          (
+            warnings = tuple(d.message for d in diagnostics if d.severity == "warning")
+          )
+    #end if
+    return \
+        settings, diagnostics
+#end load_scan
+
+def load(filepath) :
+    # returns a MaterialSettings record for the specified .mhmat file,
+    # parsing it only if it is not already in the cache. Raises Failure
+    # if any keyword has an invalid value.
+    settings, diagnostics = load_scan(filepath)
+    errors = error_messages(diagnostics)
+    if len(errors) != 0 :
+        raise Failure("; ".join(errors))
+    #end if
+    return \
+        settings
+#end load
+
+def clear_cache() :
+    with _parse_cache_lock :
+        _parse_cache.clear()
+    #end with
+#end clear_cache
+
+#+
+# Batch handling
+#-
+
+def find_mhmat_files(dirname, recursive = True) :
+    # returns a sorted list of the pathnames of all .mhmat files in the
+    # specified directory, and optionally its subdirectories. Symlinks to
+    # directories are followed, but each directory is only visited once.
+    # Raises OSError if dirname itself cannot be listed; unreadable
+    # subdirectories are skipped.
+    result = []
+    dirs = [dirname]
+    seen = set()
+    while len(dirs) != 0 :
+        dirpath = dirs.pop()
+        identity = textures.dir_identity(dirpath)
+        if identity not in seen :
+            seen.add(identity)
+            try :
+                entries = list(os.scandir(dirpath))
+            except OSError :
+                if dirpath == dirname :
+                    raise
+                #end if
+                entries = []
+            #end try
+            for entry in entries :
+                kind = textures.entry_kind(entry)
+                if kind == "dir" :
+                    if recursive :
+                        dirs.append(entry.path)
+                    #end if
+                elif kind == "file" and entry.name.lower().endswith(".mhmat") :
+                    result.append(entry.path)
+                #end if
+            #end for
+        #end if
+    #end while
+    result.sort()
+    return \
+        result
+#end find_mhmat_files
+
+def missing_textures(settings, index = None) :
+    # returns a list of (linenr, keyword, filename) for those texture
+    # references in settings which do not name an existing file. If index
+    # is a textures.DirIndex, existence is checked against its directory
+    # listings instead of looking at each file.
+    dirname = os.path.dirname(settings.filepath)
+    if index != None :
+        isfile = index.isfile
+    else :
+        isfile = os.path.isfile
+    #end if
+    return \
+        list \
+          (
+            (linenr, keyword, texname)
+            for linenr, keyword, texname in settings.textures
+            if not isfile(os.path.join(dirname, texname))
+          )
+#end missing_textures
+
+def check(filepath, index = None) :
+    # parses and validates the specified .mhmat file, returning a 2-tuple
+    # (settings, diagnostics) where diagnostics also covers missing
+    # texture files (as errors) and apparently corrupt ones (as warnings).
+    # A bad or unreadable file is only reported in diagnostics, never
+    # raised as an exception. settings is None if the file could not be
+    # read at all. index is as for missing_textures.
+    try :
+        settings, diagnostics = load_scan(filepath)
+    except (OSError, UnicodeDecodeError) as why :
+        settings = None
+        diagnostics = [unreadable(filepath, why)]
+    #end try
+    if settings != None :
+        diagnostics = list(diagnostics) # don’t modify cached list
+        missing = missing_textures(settings, index)
+        for linenr, keyword, texname in settings.textures :
+            if (linenr, keyword, texname) in missing :
+                problem = " not found"
+                severity = "error"
+            else :
+                problem = textures.probe(os.path.join(os.path.dirname(filepath), texname)).problem
+                if problem != None :
+                    # only a guess from looking at the file structure; leave
+                    # it to Blender to decide whether it can load it
+                    problem = ": " + problem
+                    severity = "warning"
+                #end if
+            #end if
+            if problem != None :
+                diagnostics.append \
+                  (
+                    Diagnostic
+                      (
+                        filepath = filepath,
+                        linenr = linenr,
+                        keyword = keyword,
+                        severity = severity,
+                        text = "%s file %s%s" % (keyword, repr(texname), problem)
+                      )
+                  )
+            #end if
+        #end for
+    #end if
+    return \
+        settings, diagnostics
+#end check
+
+def load_and_validate(filepath) :
+    # returns a 2-tuple (settings, errors) where errors is a list of
+    # messages describing why the material cannot be imported, such as
+    # bad values or missing texture files. settings is None if
+    # the file could not be read at all.
+    settings, diagnostics = check(filepath)
+    return \
+        settings, error_messages(diagnostics)
+#end load_and_validate
+
+def stream(func, items, nr_workers = None, max_pending = None) :
+    # generator which calls func on each of items on a pool of worker
+    # threads, yielding (item, result) in the same order as items. items
+    # can be any iterable, including another generator; it is only read
+    # far enough ahead to keep max_pending calls (default 4 per worker)
+    # in progress or waiting to be collected, so memory use stays bounded
+    # however many items there are.
+    if nr_workers == None :
+        nr_workers = min(32, (os.cpu_count() or 1) + 4)
+          # same as ThreadPoolExecutor default
+    #end if
+    if max_pending == None :
+        max_pending = 4 * nr_workers
+    #end if
+    items = iter(items)
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers = nr_workers) as pool :
+        try :
+            while True :
+                for item in itertools.islice(items, max_pending - len(pending)) :
+                    pending.append((item, pool.submit(func, item)))
+                #end for
+                if len(pending) == 0 :
+                    break
+                #end if
+                item, future = pending.popleft()
+                yield item, future.result()
+            #end while
+        finally :
+            # in case caller stopped early
+            for item, future in pending :
+                future.cancel()
+            #end for
+        #end try
+    #end with
+#end stream
+
+def stream_check(filepaths, nr_workers = None, max_pending = None, index = None) :
+    # generator which checks the specified .mhmat files concurrently, as
+    # for stream, yielding (filepath, settings, diagnostics) for each in
+    # order, as returned from check.
+
+    def check_one(filepath) :
+        return \
+            check(filepath, index)
+    #end check_one
+
+#begin stream_check
+    for filepath, (settings, diagnostics) in stream(check_one, filepaths, nr_workers, max_pending) :
+        yield filepath, settings, diagnostics
+    #end for
+#end stream_check
+
+def load_all(filepaths, nr_workers = None, index = None) :
+    # parses and validates all the specified .mhmat files concurrently,
+    # returning a list of (filepath, settings, errors) in the same order
+    # as filepaths. See load_and_validate for the meaning of settings and
+    # errors, and missing_textures for index.
+    return \
+        list \
+          (
+            (filepath, settings, error_messages(diagnostics))
+            for filepath, settings, diagnostics in stream_check(filepaths, nr_workers, index = index)
+          )
+#end load_all
@@ -0,0 +1,525 @@
+#+
+# Construction of material node graphs.
+#
+# Building a node graph one node and link at a time is slow, since
+# each step is a separate RNA call. So the graph for each distinct
+# combination of nodes (its “shape”) is built only once, as a template
+# material; subsequent materials with the same shape are made by
+# copying the template, which duplicates the whole node tree in one
+# go, and then patching in the images and values.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import enum
+import math
+import collections
+import bpy
+from . import \
+    imagecache, \
+    profiling
+
+def deselect_all(material_tree) :
+    for node in material_tree.nodes :
+        node.select = False
+    #end for
+#end deselect_all
+
+@enum.unique
+class MAP(enum.Enum) :
+    # each value is a 3-tuple:
+    # («name of input on Principled BSDF», «name of texture map attribute», «name of intensity attribute»)
+    ALPHA = ("Alpha", "transparencymapTexture", "transparencymapIntensity")
+    BUMP = ("Normal", "bumpmapTexture", "bumpmapIntensity")
+    DIFFUSE = ("Base Color", "diffuseTexture", None)
+    DISPLACEMENT = ("Displacement", "displacementmapTexture", "displacementmapIntensity")
+    NORMAL = ("Normal", "normalmapTexture", "normalmapIntensity")
+    SPECULAR = ("Specular IOR Level", "specularmapTexture", "specularmapIntensity")
+
+    @property
+    def principled_bsdf_input_name(self) :
+      # names of principled shader inputs are ['Base Color', 'Metallic', 'Roughness',
+      # 'IOR', 'Alpha', 'Normal', 'Weight', 'Subsurface Weight', 'Subsurface Radius',
+      # 'Subsurface Scale', 'Subsurface IOR', 'Subsurface Anisotropy',
+      # 'Specular IOR Level', 'Specular Tint', 'Anisotropic', 'Anisotropic Rotation',
+      # 'Tangent', 'Transmission Weight', 'Coat Weight', 'Coat Roughness', 'Coat IOR',
+      # 'Coat Tint', 'Coat Normal', 'Sheen Weight', 'Sheen Roughness', 'Sheen Tint',
+      # 'Emission Color', 'Emission Strength']
+        return \
+            self.value[0]
+    #end principled_bsdf_input_name
+
+    @property
+    def map_name(self) :
+        return \
+            self.value[1]
+    #end map_name
+
+    @property
+    def intensity_name(self) :
+        return \
+            self.value[2]
+    #end intensity_name
+
+    @property
+    def has_special_nodes(self) :
+        # whether the map has its own node for applying the intensity
+        # instead of a Math node.
+        return \
+            self in (MAP.BUMP, MAP.NORMAL)
+    #end has_special_nodes
+
+#end MAP
+
+shader_maps_order = (MAP.DIFFUSE, MAP.SPECULAR, MAP.ALPHA, MAP.NORMAL, MAP.BUMP)
+  # according to ordering of input nodes on Principled BSDF,
+  # to avoid wires crossing.
+
+packed_channels = \
+    { # grayscale maps that can be channel-packed => output giving their channel
+        MAP.SPECULAR : "Red",
+        MAP.ALPHA : "Green",
+        MAP.BUMP : "Blue",
+        MAP.DISPLACEMENT : "Alpha",
+    }
+  # Red, Green and Blue come from a Separate Color node, Alpha straight
+  # from the image node
+
+#+
+# Node names, used to find the nodes again when patching
+#-
+
+TEX_COORDS_NODE = "mhmat.tex_coords"
+TEX_MAPPING_NODE = "mhmat.tex_mapping"
+FANOUT_NODE = "mhmat.fanout"
+SHADER_NODE = "mhmat.shader"
+OUTPUT_NODE = "mhmat.output"
+PACKED_IMAGE_NODE = "mhmat.packed.image"
+PACKED_SEPARATE_NODE = "mhmat.packed.separate"
+
+def image_node_name(map) :
+    return \
+        "mhmat.%s.image" % map.name.lower()
+#end image_node_name
+
+def intensity_node_name(map) :
+    return \
+        "mhmat.%s.intensity" % map.name.lower()
+#end intensity_node_name
+
+#+
+# Graph shapes
+#-
+
+GraphShape = collections.namedtuple \
+  (
+    "GraphShape",
+    (
+        "maps", # tuple of MAPs present, in order of construction
+        "intensified", # frozenset of MAPs needing a Math node for the intensity
+        "diffuse_alpha", # whether the diffuse texture alpha goes to the shader alpha
+        "packed", # frozenset of MAPs taken from channels of a channel-packed image
+    )
+  )
+
+SHAPE_PROP = "mhmat_shape"
+  # records the shape of the graph a material was built with, so
+  # reloading can tell whether it needs rebuilding
+
+def shape_key(shape) :
+    # returns a string uniquely identifying the graph shape, for SHAPE_PROP.
+    return \
+        ";".join \
+          (
+            (
+                ",".join(map.name for map in shape.maps),
+                ",".join(sorted(map.name for map in shape.intensified)),
+                str(int(shape.diffuse_alpha)),
+                ",".join(sorted(map.name for map in shape.packed)),
+            )
+          )
+#end shape_key
+
+def image_has_alpha(image) :
+    has_alpha = image.get(imagecache.HAS_ALPHA_PROP)
+    if has_alpha == None :
+        # not probed when loaded, fall back to this, though it is not
+        # much use: image.channels returns 4 even when loading RGB
+        # (not RGBA) PNG image
+        has_alpha = image.channels > 3
+    #end if
+    return \
+        has_alpha
+#end image_has_alpha
+
+def graph_shape(settings, images) :
+    # works out the shape of the graph for the parsed settings and the
+    # dict of loaded images.
+    maps = tuple \
+      (
+        map
+        for map in shader_maps_order + (MAP.DISPLACEMENT,)
+        if map.map_name in images
+      )
+    return \
+        GraphShape \
+          (
+            maps = maps,
+            intensified = frozenset
+              (
+                map
+                for map in maps
+                if
+                        map.intensity_name != None
+                    and
+                        not map.has_special_nodes
+                    and
+                        getattr(settings, map.intensity_name) != 1
+              ),
+            diffuse_alpha =
+                    MAP.DIFFUSE in maps
+                and
+                    MAP.ALPHA not in maps
+                and
+                    image_has_alpha(images[MAP.DIFFUSE.map_name]),
+            packed = frozenset
+              (
+                map
+                for map in maps
+                if images[map.map_name].get(imagecache.PACKED_PROP, False)
+              )
+          )
+#end graph_shape
+
+def build_graph(material, shape) :
+    # (re)builds the node tree of the material for the specified shape,
+    # without filling in any settings-dependent values.
+    material.use_nodes = True
+    material_tree = material.node_tree
+    material_tree.nodes.clear()
+      # clear out default nodes
+    tex_coords = material_tree.nodes.new("ShaderNodeTexCoord")
+    tex_coords.name = TEX_COORDS_NODE
+    tex_coords.location = (-600, 0)
+    tex_mapping = material_tree.nodes.new("ShaderNodeMapping")
+    tex_mapping.name = TEX_MAPPING_NODE
+    tex_mapping.location = (-400, 0)
+    material_tree.links.new(tex_coords.outputs["UV"], tex_mapping.inputs["Vector"])
+    fanout = material_tree.nodes.new("NodeReroute")
+    fanout.name = FANOUT_NODE
+    fanout.location = (-200, -150)
+    material_tree.links.new(tex_mapping.outputs["Vector"], fanout.inputs[0])
+      # fanout makes it easy to change this coordinate source for all
+      # texture components at once
+    main_shader = material_tree.nodes.new("ShaderNodeBsdfPrincipled")
+    main_shader.name = SHADER_NODE
+    main_shader.location = (500, 0)
+    material_output = material_tree.nodes.new("ShaderNodeOutputMaterial")
+    material_output.name = OUTPUT_NODE
+    material_output.location = (850, 0)
+    material_tree.links.new(main_shader.outputs[0], material_output.inputs[0])
+    map_location = [-100, 0]
+    packed_nodes = []
+
+    def new_image_texture_node(map) :
+        tex_image = material_tree.nodes.new("ShaderNodeTexImage")
+        tex_image.name = image_node_name(map)
+        tex_image.location = tuple(map_location)
+        material_tree.links.new(tex_image.inputs[0], fanout.outputs[0])
+        map_location[1] -= 300
+        return \
+            tex_image
+    #end new_image_texture_node
+
+    def map_output(map) :
+        # returns the output terminal giving the texture for the map, creating
+        # the image node for it, or the shared one for a channel-packed map.
+        if map in shape.packed :
+            if len(packed_nodes) == 0 :
+                tex_image = material_tree.nodes.new("ShaderNodeTexImage")
+                tex_image.name = PACKED_IMAGE_NODE
+                tex_image.location = tuple(map_location)
+                material_tree.links.new(tex_image.inputs[0], fanout.outputs[0])
+                separate = material_tree.nodes.new("ShaderNodeSeparateColor")
+                separate.name = PACKED_SEPARATE_NODE
+                separate.location = (map_location[0] + 150, map_location[1] - 250)
+                material_tree.links.new(tex_image.outputs["Color"], separate.inputs["Color"])
+                map_location[1] -= 400
+                packed_nodes.extend((tex_image, separate))
+            #end if
+            tex_image, separate = packed_nodes
+            channel = packed_channels[map]
+            if channel == "Alpha" :
+                output_terminal = tex_image.outputs["Alpha"]
+            else :
+                output_terminal = separate.outputs[channel]
+            #end if
+        else :
+            tex_image = new_image_texture_node(map)
+            output_terminal = tex_image.outputs["Color"]
+        #end if
+        return \
+            output_terminal
+    #end map_output
+
+    def add_intensity_nodes(map, input_terminal, extra_nodes_location) :
+        output_terminal = input_terminal
+        if map in shape.intensified :
+            intensify = material_tree.nodes.new("ShaderNodeMath")
+            intensify.name = intensity_node_name(map)
+            intensify.location = extra_nodes_location
+            intensify.operation = "MULTIPLY"
+            intensify.inputs[0].default_value = 1
+            material_tree.links.new \
+              (
+                input_terminal,
+                intensify.inputs[0]
+              )
+            output_terminal = intensify.outputs[0]
+        #end if
+        return \
+            output_terminal
+    #end add_intensity_nodes
+
+    def add_bump_convert_nodes(texture_output, extra_nodes_location) :
+        # adds a node for converting a bump map to a normal map.
+        bump_convert = material_tree.nodes.new("ShaderNodeBump")
+        bump_convert.name = intensity_node_name(MAP.BUMP)
+        bump_convert.location = extra_nodes_location
+        material_tree.links.new \
+          (
+            texture_output,
+            bump_convert.inputs["Height"]
+          )
+        return \
+            bump_convert.outputs["Normal"]
+    #end add_bump_convert_nodes
+
+    def add_normal_mapping_nodes(texture_output, extra_nodes_location) :
+        # adds a node for correctly applying the normal map.
+        map = material_tree.nodes.new("ShaderNodeNormalMap")
+        map.name = intensity_node_name(MAP.NORMAL)
+        map.location = extra_nodes_location
+        material_tree.links.new \
+          (
+            texture_output,
+            map.inputs["Color"]
+          )
+        return \
+            map.outputs["Normal"]
+    #end add_normal_mapping_nodes
+
+#begin build_graph
+    add_special_nodes_for = \
+        {
+            MAP.BUMP : add_bump_convert_nodes,
+            MAP.NORMAL : add_normal_mapping_nodes,
+        }
+    diffuse_map_node = None
+    for map in shader_maps_order :
+        if map in shape.maps :
+            extra_nodes_location = list(map_location)
+            extra_nodes_location[0] += 300
+            output_terminal = map_output(map)
+            if map == MAP.DIFFUSE :
+                diffuse_map_node = output_terminal.node
+            #end if
+            add_special_nodes = add_special_nodes_for.get(map)
+            if add_special_nodes != None :
+                output_terminal = add_special_nodes(output_terminal, extra_nodes_location)
+            else :
+                output_terminal = add_intensity_nodes \
+                    (
+                        map,
+                        output_terminal,
+                        extra_nodes_location
+                    )
+            #end if
+            material_tree.links.new \
+              (
+                output_terminal,
+                main_shader.inputs[map.principled_bsdf_input_name]
+              )
+        #end if
+    #end for
+    if shape.diffuse_alpha :
+        material_tree.links.new \
+          (
+            diffuse_map_node.outputs["Alpha"],
+            main_shader.inputs["Alpha"]
+          )
+    #end if
+    if MAP.DISPLACEMENT in shape.maps :
+        extra_nodes_location = list(map_location)
+        extra_nodes_location[0] += 300
+        material_tree.links.new \
+          (
+            add_intensity_nodes
+              (
+                MAP.DISPLACEMENT,
+                map_output(MAP.DISPLACEMENT),
+                extra_nodes_location
+              ),
+            material_output.inputs["Displacement"]
+          )
+        material.cycles.displacement_method = "BOTH"
+          # values are "BUMP" (default), "DISPLACEMENT" or "BOTH"
+    #end if
+    deselect_all(material_tree)
+#end build_graph
+
+def patch_material(material, settings, images, shape, only_changed = False) :
+    # fills in all the settings-dependent values and images in a material
+    # whose graph has been built for the specified shape. If only_changed,
+    # values that are already the same are left alone, as when reloading.
+    # Returns the number of values set.
+    material_tree = material.node_tree
+    nodes = material_tree.nodes
+    nr_set = 0
+
+    def same(old_value, new_value) :
+        if isinstance(new_value, (tuple, list)) :
+            old_value = tuple(old_value)
+            result = \
+                (
+                    len(old_value) == len(new_value)
+                and
+                    all(same(a, b) for a, b in zip(old_value, new_value))
+                )
+        elif isinstance(new_value, float) :
+            result = math.isclose(old_value, new_value, rel_tol = 1e-6, abs_tol = 1e-6)
+              # allow for values stored in single precision
+        else :
+            result = old_value == new_value
+        #end if
+        return \
+            result
+    #end same
+
+    def assign(obj, attr, value) :
+        nonlocal nr_set
+        if not only_changed or not same(getattr(obj, attr), value) :
+            setattr(obj, attr, value)
+            nr_set += 1
+        #end if
+    #end assign
+
+#begin patch_material
+    assign(material, "diffuse_color", settings.diffuseColor)
+    main_shader = nodes[SHADER_NODE]
+    for attr, input in \
+        (
+            ("diffuseColor", "Base Color"),
+            ("emissiveColor", "Emission Color"),
+            ("opacity", "Alpha"),
+        ) \
+    :
+        assign(main_shader.inputs[input], "default_value", getattr(settings, attr))
+    #end for
+    assign(main_shader.inputs["Subsurface Weight"], "default_value", (0, 1)[settings.sssEnabled])
+    assign \
+      (
+        main_shader.inputs["Subsurface Radius"],
+        "default_value",
+        tuple(getattr(settings, "sss%sScale" % c) for c in ("R", "G", "B"))
+      )
+    assign(main_shader.inputs["Roughness"], "default_value", 1.0 - settings.shininess)
+    got_transparency = settings.opacity < 1 or shape.diffuse_alpha
+    for map in shape.maps :
+        image = images[map.map_name]
+        if map in shape.packed :
+            assign(nodes[PACKED_IMAGE_NODE], "image", image)
+        else :
+            assign(nodes[image_node_name(map)], "image", image)
+        #end if
+        if (
+                map == MAP.ALPHA
+            or
+                map == MAP.DISPLACEMENT and map not in shape.packed and image_has_alpha(image)
+        ) :
+            got_transparency = True
+        #end if
+        if map.has_special_nodes :
+            assign \
+              (
+                nodes[intensity_node_name(map)].inputs["Strength"],
+                "default_value",
+                getattr(settings, map.intensity_name)
+              )
+        elif map in shape.intensified :
+            assign \
+              (
+                nodes[intensity_node_name(map)].inputs[1],
+                "default_value",
+                getattr(settings, map.intensity_name)
+              )
+        #end if
+    #end for
+    assign(material, "blend_method", ("OPAQUE", "BLEND")[got_transparency])
+    return \
+        nr_set
+#end patch_material
+
+#+
+# Templates
+#-
+
+TEMPLATE_NAME = ".mhmat template"
+  # leading dot keeps templates out of most material lists. Templates
+  # have no users, so they are not saved with the .blend file.
+
+_templates = {} # shape => template material name
+
+def get_template(shape) :
+    # returns the template material for the specified shape, creating
+    # it if it does not already exist.
+    template = None
+    name = _templates.get(shape)
+    if name != None :
+        template = bpy.data.materials.get(name)
+    #end if
+    if template == None :
+        template = bpy.data.materials.new(TEMPLATE_NAME)
+        build_graph(template, shape)
+        _templates[shape] = template.name
+    #end if
+    return \
+        template
+#end get_template
+
+def clear_templates() :
+    # gets rid of all template materials.
+    for name in _templates.values() :
+        template = bpy.data.materials.get(name)
+        if template != None :
+            bpy.data.materials.remove(template)
+        #end if
+    #end for
+    _templates.clear()
+#end clear_templates
+
+def make_material(settings, images, use_templates = True, profile = profiling.null_profile) :
+    # creates a new material from the parsed settings and the dict
+    # mapping texture keyword to loaded image, building its node tree
+    # either by copying a template or from scratch.
+    with profile.phase("build_nodes") :
+        shape = graph_shape(settings, images)
+        if use_templates :
+            material = get_template(shape).copy()
+            material.name = settings.name
+            profile.count("template_copies")
+        else :
+            material = bpy.data.materials.new(settings.name)
+            build_graph(material, shape)
+        #end if
+        patch_material(material, settings, images, shape)
+        material[SHAPE_PROP] = shape_key(shape)
+    #end with
+    if profile.enabled :
+        profile.count("nodes_created", len(material.node_tree.nodes))
+        profile.count("links_created", len(material.node_tree.links))
+    #end if
+    return \
+        material
+#end make_material
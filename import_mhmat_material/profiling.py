@@ -0,0 +1,147 @@
+#+
+# Optional instrumentation of imports: per-phase timers and counters.
+# When profiling is not wanted, pass null_profile instead of a Profile;
+# its methods do nothing, so instrumented code costs next to nothing.
+# This module does not depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import time
+import json
+
+class _PhaseTimer :
+
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile, name) :
+        self.profile = profile
+        self.name = name
+    #end __init__
+
+    def __enter__(self) :
+        self.start = time.perf_counter()
+        return \
+            self
+    #end __enter__
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.profile.add_time(self.name, time.perf_counter() - self.start)
+    #end __exit__
+
+#end _PhaseTimer
+
+class Profile :
+    # accumulates the time spent in each named phase, and any number of
+    # named counters.
+
+    enabled = True
+
+    def __init__(self, label = None) :
+        self.label = label
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.phases = {} # name => [seconds, count]
+        self.counters = {}
+    #end __init__
+
+    def phase(self, name) :
+        # returns a context manager which times the enclosed code, adding
+        # the result to the phase of the specified name.
+        return \
+            _PhaseTimer(self, name)
+    #end phase
+
+    def add_time(self, name, seconds) :
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    #end add_time
+
+    def count(self, name, increment = 1) :
+        self.counters[name] = self.counters.get(name, 0) + increment
+    #end count
+
+    def as_dict(self) :
+        return \
+            {
+                "label" : self.label,
+                "started" : time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+                "total_seconds" : time.perf_counter() - self.start,
+                "phases" :
+                    dict
+                      (
+                        (name, {"seconds" : seconds, "count" : count})
+                        for name, (seconds, count) in self.phases.items()
+                      ),
+                "counters" : dict(self.counters),
+            }
+    #end as_dict
+
+    def save(self, pathname) :
+        # writes the profile as a JSON file.
+        with open(pathname, "wt") as outfile :
+            json.dump(self.as_dict(), outfile, indent = 4)
+            outfile.write("\n")
+        #end with
+    #end save
+
+    def summary(self) :
+        # returns a one-line summary of the profile.
+        items = ["total %.2fs" % (time.perf_counter() - self.start)]
+        items.extend \
+          (
+            "%s %.2fs" % (name, seconds)
+            for name, (seconds, count) in sorted(self.phases.items(), key = lambda i : - i[1][0])
+          )
+        for name, value in sorted(self.counters.items()) :
+            if name.endswith("_bytes") :
+                items.append("%s %.1fMiB" % (name, value / 1048576))
+            else :
+                items.append("%s %d" % (name, value))
+            #end if
+        #end for
+        return \
+            ", ".join(items)
+    #end summary
+
+#end Profile
+
+class _NullPhaseTimer :
+
+    __slots__ = ()
+
+    def __enter__(self) :
+        return \
+            self
+    #end __enter__
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        pass
+    #end __exit__
+
+#end _NullPhaseTimer
+
+class NullProfile :
+    # stand-in for Profile which records nothing.
+
+    enabled = False
+    _null_timer = _NullPhaseTimer()
+
+    def phase(self, name) :
+        return \
+            self._null_timer
+    #end phase
+
+    def add_time(self, name, seconds) :
+        pass
+    #end add_time
+
+    def count(self, name, increment = 1) :
+        pass
+    #end count
+
+#end NullProfile
+
+null_profile = NullProfile()
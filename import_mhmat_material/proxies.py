@@ -0,0 +1,156 @@
+#+
+# Generation of reduced-resolution proxies for texture images. Proxies
+# are kept in a cache directory under names derived from the content
+# hash of the source file, so a proxy only has to be made once for any
+# given file contents, whatever it is called and wherever it is. The
+# actual scaling is done by background Blender processes running
+# proxy_worker.py, several at once. This module does not depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import json
+import subprocess
+import tempfile
+import concurrent.futures
+if __package__ :
+    from . import \
+        mhmat, \
+        textures
+else :
+    import mhmat
+    import textures
+#end if
+
+proxy_levels = \
+    ( # items for EnumProperty
+        ("FULL", "Full Resolution", "use the texture images as they are"),
+        ("2048", "2K", "scale texture images down to at most 2048 pixels wide or high"),
+        ("1024", "1K", "scale texture images down to at most 1024 pixels wide or high"),
+        ("512", "512", "scale texture images down to at most 512 pixels wide or high"),
+    )
+
+worker_script = os.path.join(os.path.dirname(os.path.realpath(__file__)), "proxy_worker.py")
+
+def cache_root() :
+    # where the addon keeps files generated from texture images.
+    return \
+        os.path.join \
+          (
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+            "import_mhmat_material"
+          )
+#end cache_root
+
+def default_cache_dir() :
+    return \
+        os.path.join(cache_root(), "proxies")
+#end default_cache_dir
+
+def proxy_pathname(cache_dir, content_hash, size) :
+    return \
+        os.path.join(cache_dir, content_hash[:2], "%s_%d.png" % (content_hash, size))
+#end proxy_pathname
+
+def _source_record_pathname(cache_dir, content_hash) :
+    return \
+        os.path.join(cache_dir, content_hash[:2], "%s.source" % content_hash)
+#end _source_record_pathname
+
+def source_pathname(cache_dir, content_hash) :
+    # returns the pathname of the full-resolution file that proxies with
+    # the specified content hash were made from, or None if it is no
+    # longer there or its contents have changed since.
+    result = None
+    try :
+        with open(_source_record_pathname(cache_dir, content_hash), "rt") as infile :
+            pathname = infile.read().rstrip("\n")
+        #end with
+        if textures.content_hash(pathname) == content_hash :
+            result = pathname
+        #end if
+    except OSError :
+        pass
+    #end try
+    return \
+        result
+#end source_pathname
+
+def needs_proxy(pathname, size) :
+    # does the specified image file exceed the size limit. Files whose
+    # dimensions cannot be determined from their headers are assumed to.
+    info = textures.probe(pathname)
+    return \
+        info.width == None or info.height == None or max(info.width, info.height) > size
+#end needs_proxy
+
+def generate(pathnames, size, blender, cache_dir = None, nr_workers = None) :
+    # makes sure there are proxies no bigger than size for all the specified
+    # texture files, generating any missing ones by running up to nr_workers
+    # instances of the blender executable at once. Returns a dict mapping
+    # each pathname that needs a proxy to the pathname of the proxy. Files
+    # that cannot be read or are already small enough are omitted.
+    if cache_dir == None :
+        cache_dir = default_cache_dir()
+    #end if
+    hashes = textures.hash_all(pathnames, nr_workers)
+    result = {}
+    jobs = []
+    for pathname, content_hash in sorted(hashes.items()) :
+        if needs_proxy(pathname, size) :
+            proxy = proxy_pathname(cache_dir, content_hash, size)
+            result[pathname] = proxy
+            os.makedirs(os.path.dirname(proxy), exist_ok = True)
+            with open(_source_record_pathname(cache_dir, content_hash), "wt") as outfile :
+                outfile.write(pathname + "\n")
+            #end with
+            if not os.path.exists(proxy) and not any(j[1] == proxy for j in jobs) :
+                jobs.append((pathname, proxy, size))
+            #end if
+        #end if
+    #end for
+    if len(jobs) != 0 :
+        nr_workers = min(nr_workers or os.cpu_count() or 1, len(jobs))
+        with tempfile.TemporaryDirectory(prefix = "mhmat_proxies_") as tempdir :
+            batches = []
+            for i in range(nr_workers) :
+                batch = os.path.join(tempdir, "batch_%03d.json" % i)
+                with open(batch, "wt") as outfile :
+                    json.dump(jobs[i::nr_workers], outfile)
+                #end with
+                batches.append(batch)
+            #end for
+
+            def run_batch(batch) :
+                return \
+                    subprocess.run \
+                      (
+                        [
+                            blender, "--background", "--factory-startup",
+                            "--python-exit-code", "1",
+                            "--python", worker_script, "--", batch,
+                        ],
+                        stdout = subprocess.DEVNULL,
+                        stderr = subprocess.PIPE
+                      )
+            #end run_batch
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers = nr_workers) as pool :
+                runs = list(pool.map(run_batch, batches))
+            #end with
+        #end with
+        failed = list(r for r in runs if r.returncode != 0)
+        if len(failed) != 0 :
+            raise mhmat.Failure \
+              (
+                    "import_mhmat error: proxy generation failed: %s"
+                %
+                    failed[0].stderr.decode(errors = "replace").strip().split("\n")[-1]
+              )
+        #end if
+    #end if
+    return \
+        result
+#end generate
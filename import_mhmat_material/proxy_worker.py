@@ -0,0 +1,38 @@
+#+
+# Run by proxies.generate in a background Blender process, to scale
+# down a batch of texture images. Invoked as
+#
+#     blender --background --factory-startup --python proxy_worker.py -- «batch.json»
+#
+# where «batch.json» contains a list of [source, proxy, size] entries.
+# Each proxy is written as a PNG file no more than size pixels wide or
+# high, preserving the aspect ratio of the source.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import sys
+import os
+import json
+import bpy
+
+argv = sys.argv[sys.argv.index("--") + 1:]
+with open(argv[0], "rt") as infile :
+    jobs = json.load(infile)
+#end with
+for source, proxy, size in jobs :
+    image = bpy.data.images.load(source)
+    width, height = image.size
+    scale = size / max(width, height)
+    if scale < 1 :
+        image.scale(max(round(width * scale), 1), max(round(height * scale), 1))
+    #end if
+    temp = "%s.%d.png" % (proxy, os.getpid())
+    image.filepath_raw = temp
+    image.file_format = "PNG"
+    image.save()
+    os.replace(temp, proxy)
+      # so a proxy is never seen half-written
+    bpy.data.images.remove(image)
+#end for
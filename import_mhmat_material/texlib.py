@@ -0,0 +1,94 @@
+#+
+# Shared texture library: a directory where each texture file is kept
+# just once, named after its content hash, so any number of .blend
+# files can link to the same copy instead of each packing its own. The
+# library can be anywhere, including a network share; files in it are
+# never modified once written, so it is safe for several processes to
+# add to it at once. This module does not depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import shutil
+import hashlib
+if __package__ :
+    from . import \
+        textures
+else :
+    import textures
+#end if
+
+def default_library_dir() :
+    # the texture library to use if none is configured. Unlike the
+    # proxies and packed images, its contents cannot be regenerated, so
+    # it is not in the cache directory.
+    return \
+        os.path.join \
+          (
+            os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")),
+            "import_mhmat_material",
+            "textures"
+          )
+#end default_library_dir
+
+def library_pathname(library_dir, content_hash, ext) :
+    return \
+        os.path.join(library_dir, content_hash[:2], content_hash + ext.lower())
+#end library_pathname
+
+def _install(pathname, write) :
+    # creates pathname, if it does not already exist, by calling write
+    # on a temporary file which is then renamed into place, so other
+    # processes never see a partial file.
+    if not os.path.exists(pathname) :
+        os.makedirs(os.path.dirname(pathname), exist_ok = True)
+        temp = "%s.%d.tmp" % (pathname, os.getpid())
+        try :
+            write(temp)
+            os.replace(temp, pathname)
+        finally :
+            if os.path.exists(temp) :
+                os.unlink(temp)
+            #end if
+        #end try
+    #end if
+#end _install
+
+def add_file(library_dir, pathname) :
+    # makes sure the library has a copy of the specified file, returning
+    # the pathname of the copy.
+
+    def write(temp) :
+        shutil.copyfile(pathname, temp)
+    #end write
+
+#begin add_file
+    result = library_pathname \
+      (
+        library_dir,
+        textures.content_hash(pathname),
+        os.path.splitext(pathname)[1]
+      )
+    _install(result, write)
+    return \
+        result
+#end add_file
+
+def add_data(library_dir, data, ext) :
+    # makes sure the library has a file with the specified contents,
+    # such as those of a packed image, returning its pathname.
+
+    def write(temp) :
+        with open(temp, "wb") as outfile :
+            outfile.write(data)
+        #end with
+    #end write
+
+#begin add_data
+    result = library_pathname(library_dir, hashlib.sha256(data).hexdigest(), ext)
+    _install(result, write)
+    return \
+        result
+#end add_data
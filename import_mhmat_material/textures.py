@@ -0,0 +1,637 @@
+#+
+# Utilities for dealing with texture image files. This module does not
+# depend on bpy.
+#
+# Copyright 2020 by Lawrence D'Oliveiro <ldo@geek-central.gen.nz>.
+# Licensed under CC-BY-SA <http://creativecommons.org/licenses/by-sa/4.0/>.
+#-
+
+import os
+import collections
+import threading
+import concurrent.futures
+import hashlib
+import mmap
+import difflib
+
+#+
+# Per-file caching
+#
+# Information computed from the contents of a file is remembered,
+# keyed on the file’s resolved pathname, modification time and size,
+# so asking again for an unchanged file costs only a stat call.
+#-
+
+class FileCache :
+
+    def __init__(self, compute, max_size = 4096) :
+        # compute is a function taking a pathname and returning the
+        # information to be cached for that file.
+        self.compute = compute
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+    #end __init__
+
+    def __call__(self, pathname) :
+        pathname = os.path.realpath(pathname)
+        info = os.stat(pathname)
+        key = (pathname, info.st_mtime_ns, info.st_size)
+        with self.lock :
+            result = self.entries.get(key)
+            if result != None :
+                self.entries.move_to_end(key)
+            #end if
+        #end with
+        if result == None :
+            result = self.compute(pathname)
+            with self.lock :
+                self.entries[key] = result
+                while len(self.entries) > self.max_size :
+                    self.entries.popitem(last = False)
+                #end while
+            #end with
+        #end if
+        return \
+            result
+    #end __call__
+
+    def clear(self) :
+        with self.lock :
+            self.entries.clear()
+        #end with
+    #end clear
+
+#end FileCache
+
+#+
+# Content hashing
+#
+# Files are mapped into memory rather than read, so even large
+# textures are hashed without copying their contents into Python
+# objects.
+#-
+
+def hash_file(pathname) :
+    # computes the content hash of the specified file, without caching.
+    hasher = hashlib.sha256()
+    with open(pathname, "rb") as infile :
+        if os.fstat(infile.fileno()).st_size != 0 :
+          # cannot mmap empty file
+            with mmap.mmap(infile.fileno(), 0, access = mmap.ACCESS_READ) as mem :
+                hasher.update(mem)
+            #end with
+        #end if
+    #end with
+    return \
+        hasher.hexdigest()
+#end hash_file
+
+content_hash = FileCache(hash_file)
+  # returns the content hash of the specified file as a hex string,
+  # only recomputing it if the file has changed.
+
+def hash_all(pathnames, nr_workers = None) :
+    # computes the content hashes of all the specified files in parallel,
+    # returning a dict mapping each pathname to its hash. Files that
+    # cannot be read are omitted.
+
+    def try_hash(pathname) :
+        try :
+            result = content_hash(pathname)
+        except OSError :
+            result = None
+        #end try
+        return \
+            result
+    #end try_hash
+
+#begin hash_all
+    pathnames = list(set(pathnames))
+    with concurrent.futures.ThreadPoolExecutor(max_workers = nr_workers) as pool :
+        hashes = list(pool.map(try_hash, pathnames))
+    #end with
+    return \
+        dict \
+          (
+            (pathname, h)
+            for pathname, h in zip(pathnames, hashes)
+            if h != None
+          )
+#end hash_all
+
+#+
+# Header probing
+#
+# These find out the dimensions, number of channels, bit depth and
+# presence of alpha in an image file by looking only at its headers,
+# without decoding any pixels. They also do some cheap checks for
+# truncated or corrupted files.
+#-
+
+TextureInfo = collections.namedtuple \
+  (
+    "TextureInfo",
+    (
+        "format", # "PNG", "JPEG", "TGA", "TIFF", or None if not recognized
+        "width",
+        "height",
+        "channels", # number of channels actually stored in the file
+        "bit_depth", # bits per channel
+        "has_alpha",
+        "problem", # None if no problem found, else a description
+    )
+  )
+
+def _texture_info(format, **kwargs) :
+    fields = dict((f, None) for f in TextureInfo._fields)
+    fields.update(kwargs)
+    fields["format"] = format
+    if fields["has_alpha"] == None and fields["channels"] != None :
+        fields["has_alpha"] = fields["channels"] in (2, 4)
+    #end if
+    return \
+        TextureInfo(**fields)
+#end _texture_info
+
+def _probe_png(mem) :
+    if len(mem) < 33 or mem[12:16] != b"IHDR" :
+        result = _texture_info("PNG", problem = "missing PNG header")
+    else :
+        width, height = int.from_bytes(mem[16:20], "big"), int.from_bytes(mem[20:24], "big")
+        bit_depth, colour_type = mem[24], mem[25]
+        channels = {0 : 1, 2 : 3, 3 : 3, 4 : 2, 6 : 4}.get(colour_type)
+        has_alpha = None
+        problem = None
+        if channels == None :
+            problem = "invalid PNG colour type %d" % colour_type
+        #end if
+        # walk the chunks through to IEND, looking for a tRNS chunk
+        # and checking that the image data is actually there. Anything
+        # after IEND is ignored.
+        pos = 8
+        seen_idat = False
+        while problem == None :
+            if pos + 12 > len(mem) :
+                problem = "truncated PNG file"
+                break
+            #end if
+            chunk_len = int.from_bytes(mem[pos : pos + 4], "big")
+            chunk_type = mem[pos + 4 : pos + 8]
+            if pos + 12 + chunk_len > len(mem) :
+                problem = "truncated PNG file"
+                break
+            #end if
+            if chunk_type == b"tRNS" :
+                has_alpha = True
+            elif chunk_type == b"IDAT" :
+                seen_idat = True
+            elif chunk_type == b"IEND" :
+                if not seen_idat :
+                    problem = "PNG file has no image data"
+                #end if
+                break
+            #end if
+            pos += chunk_len + 12
+        #end while
+        if has_alpha == None and channels != None :
+            has_alpha = channels in (2, 4)
+        #end if
+        result = _texture_info \
+          (
+            "PNG",
+            width = width,
+            height = height,
+            channels = channels,
+            bit_depth = bit_depth,
+            has_alpha = has_alpha,
+            problem = problem
+          )
+    #end if
+    return \
+        result
+#end _probe_png
+
+def _probe_jpeg(mem) :
+    # walks the segments through to EOI, skipping over the entropy-coded
+    # data after each start of scan. Anything after EOI is ignored.
+    pos = 2
+    frame = None # fields from frame header, once seen
+    problem = None
+    while True :
+        if pos + 2 > len(mem) or mem[pos] != 0xff :
+            problem = "truncated or corrupt JPEG file"
+            break
+        #end if
+        marker = mem[pos + 1]
+        if marker == 0xff :
+            # fill byte
+            pos += 1
+            continue
+        #end if
+        if marker in (0x01,) or 0xd0 <= marker <= 0xd7 :
+            # standalone marker
+            pos += 2
+            continue
+        #end if
+        if marker == 0xd9 :
+            # end of image
+            if frame == None :
+                problem = "JPEG file has no frame header"
+            #end if
+            break
+        #end if
+        if pos + 4 > len(mem) :
+            problem = "truncated JPEG file"
+            break
+        #end if
+        seg_len = int.from_bytes(mem[pos + 2 : pos + 4], "big")
+        if pos + 2 + seg_len > len(mem) :
+            problem = "truncated JPEG file"
+            break
+        #end if
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc) :
+            # start of frame
+            if seg_len < 8 :
+                problem = "truncated or corrupt JPEG file"
+                break
+            #end if
+            frame = dict \
+              (
+                bit_depth = mem[pos + 4],
+                height = int.from_bytes(mem[pos + 5 : pos + 7], "big"),
+                width = int.from_bytes(mem[pos + 7 : pos + 9], "big"),
+                channels = mem[pos + 9],
+                has_alpha = False
+              )
+        elif marker == 0xda :
+            # start of scan
+            if frame == None :
+                problem = "JPEG file has no frame header"
+                break
+            #end if
+            # the entropy-coded data ends at the next marker that is
+            # not a stuffed zero byte or a restart marker
+            pos += 2 + seg_len
+            while True :
+                pos = mem.find(b"\xff", pos)
+                if pos < 0 or pos + 1 >= len(mem) :
+                    break
+                #end if
+                following = mem[pos + 1]
+                if following != 0 and not 0xd0 <= following <= 0xd7 :
+                    break
+                #end if
+                pos += 2
+            #end while
+            if pos < 0 or pos + 1 >= len(mem) :
+                problem = "truncated JPEG file"
+                break
+            #end if
+            continue
+        #end if
+        pos += 2 + seg_len
+    #end while
+    if frame != None :
+        result = _texture_info("JPEG", problem = problem, **frame)
+    else :
+        result = _texture_info("JPEG", problem = problem)
+    #end if
+    return \
+        result
+#end _probe_jpeg
+
+def _probe_tga(mem) :
+    # TGA files have no signature, so this tries to be careful about
+    # recognizing them.
+    if len(mem) < 18 :
+        result = _texture_info("TGA", problem = "truncated TGA header")
+    else :
+        id_len, cmap_type, image_type = mem[0], mem[1], mem[2]
+        cmap_len = int.from_bytes(mem[5:7], "little")
+        cmap_entry_bits = mem[7]
+        width = int.from_bytes(mem[12:14], "little")
+        height = int.from_bytes(mem[14:16], "little")
+        depth = mem[16]
+        alpha_bits = mem[17] & 15
+        base_type = image_type & ~8
+        channels = None
+        if base_type == 1 :
+            channels = {15 : 3, 16 : 3, 24 : 3, 32 : 4}.get(cmap_entry_bits)
+        elif base_type == 2 :
+            channels = {15 : 3, 16 : 3, 24 : 3, 32 : 4}.get(depth)
+        elif base_type == 3 :
+            channels = {8 : 1, 16 : 2}.get(depth)
+        #end if
+        if image_type not in (1, 2, 3, 9, 10, 11) or channels == None or cmap_type > 1 :
+            result = _texture_info("TGA", problem = "invalid TGA header")
+        else :
+            problem = None
+            if image_type < 8 :
+              # uncompressed, can check size
+                expected = \
+                    (
+                        18
+                    +
+                        id_len
+                    +
+                        cmap_type * cmap_len * ((cmap_entry_bits + 7) // 8)
+                    +
+                        width * height * ((depth + 7) // 8)
+                    )
+                if len(mem) < expected :
+                    problem = "truncated TGA file"
+                #end if
+            #end if
+            result = _texture_info \
+              (
+                "TGA",
+                width = width,
+                height = height,
+                channels = channels,
+                bit_depth = 8,
+                has_alpha = alpha_bits != 0 or channels in (2, 4),
+                problem = problem
+              )
+        #end if
+    #end if
+    return \
+        result
+#end _probe_tga
+
+def _probe_tiff(mem) :
+    byteorder = ("big", "little")[mem[:2] == b"II"]
+    getint = lambda pos, size : int.from_bytes(mem[pos : pos + size], byteorder)
+    type_sizes = {1 : 1, 3 : 2, 4 : 4, 16 : 8}
+
+    def get_values(entry) :
+        # returns list of integer values for the IFD entry at the
+        # specified position.
+        field_type = getint(entry + 2, 2)
+        count = getint(entry + 4, 4)
+        size = type_sizes.get(field_type)
+        if size == None :
+            result = []
+        else :
+            if size * count <= 4 :
+                pos = entry + 8
+            else :
+                pos = getint(entry + 8, 4)
+            #end if
+            if pos + size * count > len(mem) :
+                raise IndexError("value out of range")
+            #end if
+            result = list(getint(pos + i * size, size) for i in range(count))
+        #end if
+        return \
+            result
+    #end get_values
+
+#begin _probe_tiff
+    try :
+        ifd = getint(4, 4)
+        nr_entries = getint(ifd, 2)
+        if ifd + 2 + nr_entries * 12 > len(mem) :
+            raise IndexError("IFD out of range")
+        #end if
+        tags = {}
+        for i in range(nr_entries) :
+            entry = ifd + 2 + i * 12
+            tag = getint(entry, 2)
+            if tag in (256, 257, 258, 273, 277, 279, 324, 325, 338) :
+                tags[tag] = get_values(entry)
+            #end if
+        #end for
+        channels = tags.get(277, [1])[0]
+        problem = None
+        for offsets_tag, counts_tag in ((273, 279), (324, 325)) :
+            if offsets_tag in tags and counts_tag in tags :
+                if max(o + c for o, c in zip(tags[offsets_tag], tags[counts_tag])) > len(mem) :
+                    problem = "truncated TIFF file"
+                #end if
+            #end if
+        #end for
+        result = _texture_info \
+          (
+            "TIFF",
+            width = tags.get(256, [None])[0],
+            height = tags.get(257, [None])[0],
+            channels = channels,
+            bit_depth = tags.get(258, [1])[0],
+            has_alpha = any(v in (1, 2) for v in tags.get(338, [])),
+            problem = problem
+          )
+    except (IndexError, ValueError) :
+        result = _texture_info("TIFF", problem = "truncated or corrupt TIFF file")
+    #end try
+    return \
+        result
+#end _probe_tiff
+
+def probe_file(pathname) :
+    # examines the headers of the specified image file and returns a
+    # TextureInfo, without caching.
+    ext = os.path.splitext(pathname)[1].lower()
+    with open(pathname, "rb") as infile :
+        if os.fstat(infile.fileno()).st_size == 0 :
+            result = _texture_info(None, problem = "empty file")
+        else :
+            with mmap.mmap(infile.fileno(), 0, access = mmap.ACCESS_READ) as mem :
+                if mem[:8] == b"\x89PNG\r\n\x1a\n" :
+                    result = _probe_png(mem)
+                elif mem[:3] == b"\xff\xd8\xff" :
+                    result = _probe_jpeg(mem)
+                elif mem[:4] in (b"II*\0", b"MM\0*") :
+                    result = _probe_tiff(mem)
+                elif ext == ".tga" :
+                    result = _probe_tga(mem)
+                elif ext in (".png", ".jpg", ".jpeg", ".tif", ".tiff") :
+                    result = _texture_info \
+                      (
+                        None,
+                        problem = "not a valid %s file" % ext[1:].upper()
+                      )
+                else :
+                    result = _texture_info(None)
+                      # some other format, assume it’s OK
+                #end if
+            #end with
+        #end if
+    #end with
+    return \
+        result
+#end probe_file
+
+probe = FileCache(probe_file)
+  # returns a TextureInfo for the specified image file, only reexamining
+  # it if the file has changed.
+
+def clear_cache() :
+    content_hash.clear()
+    probe.clear()
+#end clear_cache
+
+#+
+# Directory index
+#
+# Checking for the existence of lots of files one at a time is slow,
+# particularly on network filesystems. Instead, the contents of each
+# directory are listed once with os.scandir, and existence checks
+# become set lookups. Having the listing also allows suggesting the
+# file that was probably intended when a name is wrong.
+#-
+
+def entry_kind(entry) :
+    # returns "dir" or "file" according to what the os.DirEntry refers
+    # to, following symlinks, or None if it is neither or cannot be
+    # examined (e.g. a dangling or looping symlink).
+    try :
+        if entry.is_dir() :
+            result = "dir"
+        elif entry.is_file() :
+            result = "file"
+        else :
+            result = None
+        #end if
+    except OSError :
+        result = None
+    #end try
+    return \
+        result
+#end entry_kind
+
+def dir_identity(dirpath) :
+    # returns a key which is the same for all paths to the same directory,
+    # even via symlinks, so tree walks can avoid visiting it more than
+    # once, or None if it cannot be examined.
+    try :
+        info = os.stat(dirpath)
+    except OSError :
+        result = None
+    else :
+        result = (info.st_dev, info.st_ino)
+    #end try
+    return \
+        result
+#end dir_identity
+
+class DirIndex :
+
+    def __init__(self) :
+        self.listings = {} # directory pathname => frozenset of names of files in it
+        self.lock = threading.Lock()
+    #end __init__
+
+    @staticmethod
+    def _normalize(dirpath) :
+        return \
+            os.path.normpath(os.path.abspath(dirpath))
+    #end _normalize
+
+    def scan_tree(self, root) :
+        # indexes root and all its subdirectories, and returns a sorted
+        # list of the pathnames of all the files found. Symlinks to
+        # directories are followed, but each directory is only listed
+        # once, so links back up the tree do not cause endless descent;
+        # any further paths to it get the same listing.
+        result = []
+        dirs = [self._normalize(root)]
+        listed = {} # directory identity => frozenset of names of files in it
+        while len(dirs) != 0 :
+            dirpath = dirs.pop()
+            identity = dir_identity(dirpath)
+            if identity in listed :
+                # already been here by another path
+                names = listed[identity]
+            else :
+                try :
+                    entries = list(os.scandir(dirpath))
+                except OSError :
+                    entries = []
+                #end try
+                names = []
+                for entry in entries :
+                    kind = entry_kind(entry)
+                    if kind == "dir" :
+                        dirs.append(entry.path)
+                    elif kind == "file" :
+                        names.append(entry.name)
+                        result.append(entry.path)
+                    #end if
+                #end for
+                names = frozenset(names)
+                if identity != None :
+                    listed[identity] = names
+                #end if
+            #end if
+            with self.lock :
+                self.listings[dirpath] = names
+            #end with
+        #end while
+        result.sort()
+        return \
+            result
+    #end scan_tree
+
+    def listing(self, dirpath) :
+        # returns the set of names of files in the specified directory,
+        # which is empty if it does not exist.
+        dirpath = self._normalize(dirpath)
+        with self.lock :
+            result = self.listings.get(dirpath)
+        #end with
+        if result == None :
+            try :
+                result = frozenset(e.name for e in os.scandir(dirpath) if entry_kind(e) == "file")
+            except OSError :
+                result = frozenset()
+            #end try
+            with self.lock :
+                self.listings[dirpath] = result
+            #end with
+        #end if
+        return \
+            result
+    #end listing
+
+    def isfile(self, pathname) :
+        dirpath, name = os.path.split(pathname)
+        return \
+            name in self.listing(dirpath)
+    #end isfile
+
+    def suggest(self, pathname) :
+        # returns the name of the existing file in the same directory that
+        # pathname most likely should have referred to, or None if there is
+        # no plausible candidate. Preference is given to names differing
+        # only in case, then to ones differing only in extension.
+        dirpath, name = os.path.split(pathname)
+        names = sorted(self.listing(dirpath))
+        result = None
+        lname = name.lower()
+        lstem = os.path.splitext(lname)[0]
+        for candidate in names :
+            if candidate.lower() == lname :
+                result = candidate
+                break
+            #end if
+        #end for
+        if result == None :
+            for candidate in names :
+                if os.path.splitext(candidate.lower())[0] == lstem :
+                    result = candidate
+                    break
+                #end if
+            #end for
+        #end if
+        if result == None :
+            matches = difflib.get_close_matches(name, names, n = 1, cutoff = 0.6)
+            if len(matches) != 0 :
+                result = matches[0]
+            #end if
+        #end if
+        return \
+            result
+    #end suggest
+
+#end DirIndex